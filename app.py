@@ -1,25 +1,73 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, request, send_from_directory, url_for
 from flask_cors import CORS
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import config
 from database import (
-    init_db, get_session, ParkingSpace, OccupancyHistory,
-    ParkingEvent, OccupancyPrediction, Booking, Payment
+    init_db, Session, get_occupancy_counts, build_space_grid,
+    ParkingSpace, OccupancyHistory, ParkingEvent, OccupancyPrediction, Booking, Payment
 )
+from sqlalchemy import func, and_, not_, exists, insert, delete
+from sqlalchemy.orm import joinedload
 from parking_detector import ParkingSpaceDetector
-from ml_predictor import OccupancyPredictor
+from ml_predictor import OccupancyPredictor, format_predictions
+from payment_gateway import create_payment_intent, PaymentGatewayError
+from cache import (
+    cached, invalidate, get_bytes, set_bytes,
+    STATUS_KEY, STATS_KEY, EVENTS_KEY, PREDICTIONS_KEY
+)
 import cv2
 import numpy as np
-from PIL import Image
-import io
 import base64
+import orjson
 import random
-import string
-import json
+import os
+import time
+from functools import wraps, lru_cache
+from itertools import count
 
 app = Flask(__name__)
 CORS(app)
 
+# Compress large JSON responses when flask-compress is installed
+try:
+    from flask_compress import Compress
+    app.config.update(
+        COMPRESS_ALGORITHM=['br', 'gzip'],
+        COMPRESS_MIN_SIZE=512,
+        COMPRESS_LEVEL=4,
+        COMPRESS_BR_LEVEL=4
+    )
+    Compress(app)
+except ImportError:
+    pass
+
+
+def ojson(obj, status=200):
+    """Serialize a JSON response with orjson"""
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def with_session(fn):
+    """Run a view with a request-scoped database session as its first argument"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = Session()
+        try:
+            return fn(session, *args, **kwargs)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            Session.remove()
+
+    return wrapper
+
+
 # Initialize components
 detector = ParkingSpaceDetector()
 predictor = OccupancyPredictor()
@@ -38,391 +86,395 @@ def index():
     return render_template('index.html')
 
 
+# Fixed response schemas for the space and event lists: rows are fetched
+# as column tuples and zipped with the field names, skipping ORM hydration
+_STATUS_FIELDS = ('space_number', 'row', 'column', 'is_occupied', 'vehicle_type', 'last_updated')
+_STATUS_COLUMNS = [getattr(ParkingSpace, f) for f in _STATUS_FIELDS]
+
+_AVAILABLE_FIELDS = ('space_number', 'row', 'column', 'hourly_rate', 'is_occupied', 'image_path')
+_AVAILABLE_COLUMNS = [getattr(ParkingSpace, f) for f in _AVAILABLE_FIELDS]
+
+_EVENT_FIELDS = ('id', 'space_number', 'event_type', 'timestamp', 'vehicle_type', 'confidence')
+_EVENT_COLUMNS = [getattr(ParkingEvent, f) for f in _EVENT_FIELDS]
+
+_SPACE_EVENT_FIELDS = ('event_type', 'timestamp', 'vehicle_type', 'confidence')
+_SPACE_EVENT_COLUMNS = [getattr(ParkingEvent, f) for f in _SPACE_EVENT_FIELDS]
+
+
 @app.route('/api/parking/status', methods=['GET'])
-def get_parking_status():
+@cached(STATUS_KEY, policy='short')
+@with_session
+def get_parking_status(session):
     """Get current parking lot status"""
-    session = get_session()
+    include_spaces = request.args.get('include_spaces', default='true').lower() != 'false'
 
-    try:
-        # Get all parking spaces
-        spaces = session.query(ParkingSpace).all()
+    if include_spaces:
+        # Fetch only the columns the dashboard grid needs, as plain rows
+        spaces = session.query(*_STATUS_COLUMNS).all()
 
-        # Calculate statistics
         total_spaces = len(spaces)
-        occupied = sum(1 for s in spaces if s.is_occupied)
-        available = total_spaces - occupied
-        occupancy_rate = (occupied / total_spaces * 100) if total_spaces > 0 else 0
-
-        space_data = [{
-            'space_number': s.space_number,
-            'row': s.row,
-            'column': s.column,
-            'is_occupied': s.is_occupied,
-            'vehicle_type': s.vehicle_type,
-            'last_updated': s.last_updated.isoformat() if s.last_updated else None
-        } for s in spaces]
-
-        return jsonify({
-            'success': True,
-            'timestamp': datetime.now().isoformat(),
-            'statistics': {
-                'total': total_spaces,
-                'occupied': occupied,
-                'available': available,
-                'occupancy_rate': round(occupancy_rate, 2)
-            },
-            'spaces': space_data
-        })
-
-    finally:
-        session.close()
+        occupied = int(np.fromiter(
+            (bool(s.is_occupied) for s in spaces), dtype=np.uint8, count=total_spaces
+        ).sum())
+    else:
+        total_spaces, occupied = get_occupancy_counts(session)
 
+    # Calculate statistics
+    available = total_spaces - occupied
+    occupancy_rate = (occupied / total_spaces * 100) if total_spaces > 0 else 0
 
-@app.route('/api/parking/space/<space_number>', methods=['GET'])
-def get_space_details(space_number):
-    """Get details for a specific parking space"""
-    session = get_session()
+    response = {
+        'success': True,
+        'timestamp': datetime.now(),
+        'statistics': {
+            'total': total_spaces,
+            'occupied': occupied,
+            'available': available,
+            'occupancy_rate': round(occupancy_rate, 2)
+        }
+    }
 
-    try:
-        space = session.query(ParkingSpace).filter_by(
-            space_number=space_number
-        ).first()
-
-        if not space:
-            return jsonify({'success': False, 'error': 'Space not found'}), 404
-
-        # Get recent events for this space
-        events = session.query(ParkingEvent).filter_by(
-            space_number=space_number
-        ).order_by(ParkingEvent.timestamp.desc()).limit(10).all()
-
-        event_data = [{
-            'event_type': e.event_type,
-            'timestamp': e.timestamp.isoformat(),
-            'vehicle_type': e.vehicle_type,
-            'confidence': e.confidence
-        } for e in events]
-
-        return jsonify({
-            'success': True,
-            'space': {
-                'space_number': space.space_number,
-                'row': space.row,
-                'column': space.column,
-                'is_occupied': space.is_occupied,
-                'vehicle_type': space.vehicle_type,
-                'last_updated': space.last_updated.isoformat() if space.last_updated else None
-            },
-            'recent_events': event_data
-        })
+    if include_spaces:
+        response['spaces'] = [dict(zip(_STATUS_FIELDS, s)) for s in spaces]
 
-    finally:
-        session.close()
+    return ojson(response)
 
 
-@app.route('/api/occupancy/history', methods=['GET'])
-def get_occupancy_history():
-    """Get occupancy history for a time range"""
-    hours = request.args.get('hours', default=24, type=int)
-    session = get_session()
+@app.route('/api/parking/space/<space_number>', methods=['GET'])
+@with_session
+def get_space_details(session, space_number):
+    """Get details for a specific parking space"""
+    space = session.query(*_STATUS_COLUMNS).filter(
+        ParkingSpace.space_number == space_number
+    ).first()
 
-    try:
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+    if not space:
+        return ojson({'success': False, 'error': 'Space not found'}, 404)
 
-        history = session.query(OccupancyHistory).filter(
-            OccupancyHistory.timestamp >= cutoff_time
-        ).order_by(OccupancyHistory.timestamp).all()
+    # Get recent events for this space
+    events = session.query(*_SPACE_EVENT_COLUMNS).filter(
+        ParkingEvent.space_number == space_number
+    ).order_by(ParkingEvent.timestamp.desc()).limit(10).all()
 
-        data = [{
-            'timestamp': h.timestamp.isoformat(),
-            'occupied': h.occupied_spaces,
-            'available': h.available_spaces,
-            'occupancy_rate': h.occupancy_rate
-        } for h in history]
+    return ojson({
+        'success': True,
+        'space': dict(zip(_STATUS_FIELDS, space)),
+        'recent_events': [dict(zip(_SPACE_EVENT_FIELDS, e)) for e in events]
+    })
 
-        return jsonify({
-            'success': True,
-            'data': data
-        })
 
-    finally:
-        session.close()
+@app.route('/api/occupancy/history', methods=['GET'])
+@with_session
+def get_occupancy_history(session):
+    """Get occupancy history for a time range"""
+    # At least one hour; zero or negative values would select nothing or the future
+    hours = max(1, request.args.get('hours', default=24, type=int))
+    cutoff_time = datetime.now() - timedelta(hours=hours)
+
+    # Plain column tuples - no ORM object per history row
+    history = session.query(
+        OccupancyHistory.timestamp,
+        OccupancyHistory.occupied_spaces,
+        OccupancyHistory.available_spaces,
+        OccupancyHistory.occupancy_rate
+    ).filter(
+        OccupancyHistory.timestamp >= cutoff_time
+    ).order_by(OccupancyHistory.timestamp).all()
+
+    data = [{
+        'timestamp': timestamp,
+        'occupied': occupied,
+        'available': available,
+        'occupancy_rate': occupancy_rate
+    } for timestamp, occupied, available, occupancy_rate in history]
+
+    return ojson({
+        'success': True,
+        'data': data
+    })
 
 
 @app.route('/api/occupancy/predict', methods=['GET'])
 def predict_occupancy():
     """Predict future occupancy"""
-    hours_ahead = request.args.get('hours', default=6, type=int)
+    # At least one hour; a negative count would slice the cached payload from the end
+    hours_ahead = max(1, request.args.get('hours', default=6, type=int))
+    horizon = config.MODEL_CONFIG['prediction_horizon']
 
-    try:
-        # Get current occupancy
-        session = get_session()
-        spaces = session.query(ParkingSpace).all()
-        current_occupied = sum(1 for s in spaces if s.is_occupied)
-        current_occupancy_rate = current_occupied / len(spaces) if len(spaces) > 0 else 0
-        session.close()
-
-        # Get predictions
-        predictions = predictor.predict_future_occupancy(
-            hours_ahead=hours_ahead,
-            current_data={
-                'current_occupancy': current_occupied,
-                'avg_occupancy_last_hour': current_occupancy_rate
-            }
-        )
+    # Serve predictions precomputed by predict_worker.py when available
+    cached_body = get_bytes(PREDICTIONS_KEY) if hours_ahead <= horizon else None
+    if cached_body is not None:
+        if hours_ahead == horizon:
+            return Response(cached_body, mimetype='application/json')
+
+        payload = orjson.loads(cached_body)
+        payload['predictions'] = payload['predictions'][:hours_ahead]
+        return ojson(payload)
 
-        data = [{
-            'timestamp': p['target_time'].isoformat(),
-            'predicted_occupancy_rate': p['predicted_occupancy_rate'],
-            'predicted_occupied': p['predicted_occupied_spaces'],
-            'predicted_available': p['predicted_available_spaces']
-        } for p in predictions]
+    try:
+        predictions = predictor.predict_from_database(hours_ahead=hours_ahead)
 
-        return jsonify({
+        response = ojson({
             'success': True,
-            'predictions': data
+            'predictions': format_predictions(predictions)
         })
 
+        if hours_ahead == horizon:
+            set_bytes(PREDICTIONS_KEY, response.get_data(),
+                      config.MODEL_CONFIG['prediction_cache_ttl'])
+
+        return response
+
     except Exception as e:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 
 @app.route('/api/events/recent', methods=['GET'])
-def get_recent_events():
+@cached(EVENTS_KEY, policy='short')
+@with_session
+def get_recent_events(session):
     """Get recent parking events"""
-    limit = request.args.get('limit', default=50, type=int)
-    session = get_session()
+    # At least one row; SQLite treats a negative LIMIT as no limit at all
+    limit = max(1, request.args.get('limit', default=50, type=int))
 
-    try:
-        events = session.query(ParkingEvent).order_by(
-            ParkingEvent.timestamp.desc()
-        ).limit(limit).all()
-
-        data = [{
-            'id': e.id,
-            'space_number': e.space_number,
-            'event_type': e.event_type,
-            'timestamp': e.timestamp.isoformat(),
-            'vehicle_type': e.vehicle_type,
-            'confidence': e.confidence
-        } for e in events]
-
-        return jsonify({
-            'success': True,
-            'events': data
-        })
+    events = session.query(*_EVENT_COLUMNS).order_by(
+        ParkingEvent.timestamp.desc()
+    ).limit(limit).all()
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'events': [dict(zip(_EVENT_FIELDS, e)) for e in events]
+    })
 
 
 @app.route('/api/statistics/summary', methods=['GET'])
-def get_statistics_summary():
+@cached(STATS_KEY, policy='short')
+@with_session
+def get_statistics_summary(session):
     """Get summary statistics"""
-    session = get_session()
-
-    try:
-        # Current status
-        spaces = session.query(ParkingSpace).all()
-        total = len(spaces)
-        occupied = sum(1 for s in spaces if s.is_occupied)
-
-        # Today's events
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        entries_today = session.query(ParkingEvent).filter(
-            ParkingEvent.timestamp >= today,
-            ParkingEvent.event_type == 'entry'
-        ).count()
-
-        exits_today = session.query(ParkingEvent).filter(
-            ParkingEvent.timestamp >= today,
-            ParkingEvent.event_type == 'exit'
-        ).count()
-
-        # Average occupancy today
-        history_today = session.query(OccupancyHistory).filter(
-            OccupancyHistory.timestamp >= today
-        ).all()
-
-        avg_occupancy_today = np.mean([h.occupancy_rate for h in history_today]) if history_today else 0
-
-        # Peak occupancy today
-        peak_occupancy_today = max([h.occupied_spaces for h in history_today]) if history_today else 0
-
-        return jsonify({
-            'success': True,
-            'current': {
-                'total': total,
-                'occupied': occupied,
-                'available': total - occupied,
-                'occupancy_rate': round((occupied / total * 100) if total > 0 else 0, 2)
-            },
-            'today': {
-                'entries': entries_today,
-                'exits': exits_today,
-                'avg_occupancy_rate': round(avg_occupancy_today, 2),
-                'peak_occupancy': peak_occupancy_today
-            }
-        })
-
-    finally:
-        session.close()
+    # Current status
+    total, occupied = get_occupancy_counts(session)
+
+    # Today's events, counted per type in one query
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    event_counts = dict(session.query(
+        ParkingEvent.event_type, func.count(ParkingEvent.id)
+    ).filter(
+        ParkingEvent.timestamp >= today
+    ).group_by(ParkingEvent.event_type).all())
+
+    entries_today = event_counts.get('entry', 0)
+    exits_today = event_counts.get('exit', 0)
+
+    # Average and peak occupancy today (0 rather than NULL before the first snapshot)
+    avg_occupancy_today, peak_occupancy_today = session.query(
+        func.coalesce(func.avg(OccupancyHistory.occupancy_rate), 0),
+        func.coalesce(func.max(OccupancyHistory.occupied_spaces), 0)
+    ).filter(
+        OccupancyHistory.timestamp >= today
+    ).one()
+
+    return ojson({
+        'success': True,
+        'current': {
+            'total': total,
+            'occupied': occupied,
+            'available': total - occupied,
+            'occupancy_rate': round((occupied / total * 100) if total > 0 else 0, 2)
+        },
+        'today': {
+            'entries': entries_today,
+            'exits': exits_today,
+            'avg_occupancy_rate': round(avg_occupancy_today, 2),
+            'peak_occupancy': peak_occupancy_today
+        }
+    })
 
 
 @app.route('/api/parking/update', methods=['POST'])
-def update_parking_status():
+@with_session
+def update_parking_status(session):
     """Update parking space status (for manual updates or testing)"""
     data = request.json
     space_number = data.get('space_number')
     is_occupied = data.get('is_occupied')
 
     if not space_number:
-        return jsonify({'success': False, 'error': 'space_number required'}), 400
+        return ojson({'success': False, 'error': 'space_number required'}, 400)
+
+    space = session.query(ParkingSpace).filter_by(
+        space_number=space_number
+    ).first()
+
+    if not space:
+        return ojson({'success': False, 'error': 'Space not found'}, 404)
+
+    # Update space
+    old_status = space.is_occupied
+    space.is_occupied = is_occupied
+    space.last_updated = datetime.now()
+
+    if 'vehicle_type' in data:
+        space.vehicle_type = data['vehicle_type']
+
+    # Log event if status changed
+    if old_status != is_occupied:
+        event = ParkingEvent(
+            space_number=space_number,
+            event_type='entry' if is_occupied else 'exit',
+            vehicle_type=data.get('vehicle_type'),
+            confidence=data.get('confidence', 1.0)
+        )
+        session.add(event)
 
-    session = get_session()
+    session.commit()
+    invalidate()
 
-    try:
-        space = session.query(ParkingSpace).filter_by(
-            space_number=space_number
-        ).first()
-
-        if not space:
-            return jsonify({'success': False, 'error': 'Space not found'}), 404
-
-        # Update space
-        old_status = space.is_occupied
-        space.is_occupied = is_occupied
-        space.last_updated = datetime.now()
-
-        if 'vehicle_type' in data:
-            space.vehicle_type = data['vehicle_type']
-
-        # Log event if status changed
-        if old_status != is_occupied:
-            event = ParkingEvent(
-                space_number=space_number,
-                event_type='entry' if is_occupied else 'exit',
-                vehicle_type=data.get('vehicle_type'),
-                confidence=data.get('confidence', 1.0)
-            )
-            session.add(event)
+    return ojson({
+        'success': True,
+        'message': 'Space updated successfully'
+    })
 
-        session.commit()
 
-        return jsonify({
-            'success': True,
-            'message': 'Space updated successfully'
-        })
+@app.route('/api/initialize', methods=['POST'])
+@with_session
+def initialize_parking_lot(session):
+    """Initialize parking lot with empty spaces"""
+    # Replace existing spaces with one multi-row insert
+    rows = config.PARKING_LOT_CONFIG['rows']
+    cols = config.PARKING_LOT_CONFIG['columns']
 
-    finally:
-        session.close()
+    session.execute(delete(ParkingSpace))
+    session.execute(insert(ParkingSpace), build_space_grid(rows, cols))
 
+    session.commit()
+    invalidate()
 
-@app.route('/api/initialize', methods=['POST'])
-def initialize_parking_lot():
-    """Initialize parking lot with empty spaces"""
-    session = get_session()
+    return ojson({
+        'success': True,
+        'message': f'Initialized {rows * cols} parking spaces'
+    })
 
-    try:
-        # Clear existing spaces
-        session.query(ParkingSpace).delete()
-
-        # Create new spaces
-        rows = config.PARKING_LOT_CONFIG['rows']
-        cols = config.PARKING_LOT_CONFIG['columns']
-
-        space_id = 1
-        for row in range(rows):
-            for col in range(cols):
-                space = ParkingSpace(
-                    space_number=f'P{space_id:03d}',
-                    row=row,
-                    column=col,
-                    is_occupied=False
-                )
-                session.add(space)
-                space_id += 1
 
-        session.commit()
+# ============ BOOKING ENDPOINTS ============
 
-        return jsonify({
-            'success': True,
-            'message': f'Initialized {rows * cols} parking spaces'
-        })
+@dataclass
+class BookingDTO:
+    """Booking summary returned when a booking is created"""
+    __slots__ = ('booking_reference', 'space_number', 'start_time', 'end_time',
+                 'total_amount', 'status', 'payment_status')
+
+    booking_reference: str
+    space_number: str
+    start_time: datetime
+    end_time: datetime
+    total_amount: float
+    status: str
+    payment_status: str
+
+    @classmethod
+    def from_row(cls, booking: Booking) -> 'BookingDTO':
+        return cls(
+            booking.booking_reference, booking.space_number, booking.start_time,
+            booking.end_time, booking.total_amount, booking.status, booking.payment_status
+        )
 
-    finally:
-        session.close()
 
+@dataclass
+class PaymentDTO:
+    """Payment summary returned when a payment is processed"""
+    __slots__ = ('payment_reference', 'amount', 'status', 'booking_reference')
+
+    payment_reference: str
+    amount: float
+    status: str
+    booking_reference: str
+
+    @classmethod
+    def from_row(cls, payment: Payment, booking_reference: str) -> 'PaymentDTO':
+        return cls(payment.payment_reference, payment.amount, payment.status, booking_reference)
+
+
+@lru_cache(maxsize=2048)
+def _iso(value: str) -> datetime:
+    """Parse an ISO datetime request param (cached - the UI repeats them)"""
+    return datetime.fromisoformat(value)
+
+
+_reference_counter = count()
+_reference_worker = None  # worker slot set by gunicorn's post_fork; the pid otherwise
+
+
+def init_reference_worker(worker_id: int):
+    """Tag this process's references with a worker id and restart its counter"""
+    global _reference_worker, _reference_counter
+    _reference_worker = worker_id
+    _reference_counter = count()
 
-# ============ BOOKING ENDPOINTS ============
 
 def generate_reference(prefix='BK'):
-    """Generate a unique booking or payment reference"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"{prefix}{timestamp}{random_str}"
+    """
+    Generate a unique booking or payment reference
+
+    Packs (milliseconds << 16 | worker << 8 | counter) into 64 bits and
+    encodes it as base32, without an RNG call. Under gunicorn the worker is
+    the slot gunicorn.conf.py assigns (no two live workers share one), so
+    references are unique for up to 256 workers issuing up to 256 references
+    per millisecond each. Run standalone, the pid stands in for the slot.
+    """
+    worker = os.getpid() if _reference_worker is None else _reference_worker
+    value = (
+        (time.time_ns() // 1_000_000) << 16
+        | (worker & 0xFF) << 8
+        | (next(_reference_counter) & 0xFF)
+    )
+    return prefix + base64.b32encode(value.to_bytes(8, 'big')).rstrip(b'=').decode()
 
 
 @app.route('/api/bookings/available', methods=['GET'])
-def get_available_slots():
+@with_session
+def get_available_slots(session):
     """Get available parking spaces for booking"""
     start_time_str = request.args.get('start_time')
     end_time_str = request.args.get('end_time')
 
     if not start_time_str or not end_time_str:
-        return jsonify({'success': False, 'error': 'start_time and end_time required'}), 400
+        return ojson({'success': False, 'error': 'start_time and end_time required'}, 400)
 
     try:
-        start_time = datetime.fromisoformat(start_time_str)
-        end_time = datetime.fromisoformat(end_time_str)
+        start_time = _iso(start_time_str)
+        end_time = _iso(end_time_str)
     except ValueError:
-        return jsonify({'success': False, 'error': 'Invalid datetime format'}), 400
+        return ojson({'success': False, 'error': 'Invalid datetime format'}, 400)
 
-    session = get_session()
+    # Spaces with a confirmed/active booking overlapping the requested time
+    overlapping_booking = exists().where(and_(
+        Booking.space_number == ParkingSpace.space_number,
+        Booking.status.in_(['confirmed', 'active']),
+        Booking.start_time < end_time,
+        Booking.end_time > start_time
+    ))
 
-    try:
-        # Get all parking spaces
-        all_spaces = session.query(ParkingSpace).all()
-
-        # Get bookings that overlap with requested time
-        overlapping_bookings = session.query(Booking).filter(
-            Booking.status.in_(['confirmed', 'active']),
-            Booking.start_time < end_time,
-            Booking.end_time > start_time
-        ).all()
-
-        # Get booked space numbers
-        booked_space_numbers = {b.space_number for b in overlapping_bookings}
-
-        # Filter available spaces
-        available_spaces = [
-            {
-                'space_number': s.space_number,
-                'row': s.row,
-                'column': s.column,
-                'hourly_rate': s.hourly_rate,
-                'is_occupied': s.is_occupied,
-                'image_path': s.image_path
-            }
-            for s in all_spaces
-            if s.space_number not in booked_space_numbers and not s.is_occupied
-        ]
+    spaces = session.query(*_AVAILABLE_COLUMNS).filter(
+        ParkingSpace.is_occupied == False,
+        not_(overlapping_booking)
+    ).all()
 
-        return jsonify({
-            'success': True,
-            'available_spaces': available_spaces,
-            'total_available': len(available_spaces)
-        })
+    available_spaces = [dict(zip(_AVAILABLE_FIELDS, s)) for s in spaces]
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'available_spaces': available_spaces,
+        'total_available': len(available_spaces)
+    })
 
 
 @app.route('/api/bookings/calculate', methods=['POST'])
-def calculate_booking_cost():
+@with_session
+def calculate_booking_cost(session):
     """Calculate booking cost"""
     data = request.json
     start_time_str = data.get('start_time')
@@ -430,39 +482,34 @@ def calculate_booking_cost():
     space_number = data.get('space_number')
 
     if not all([start_time_str, end_time_str, space_number]):
-        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        return ojson({'success': False, 'error': 'Missing required fields'}, 400)
 
     try:
-        start_time = datetime.fromisoformat(start_time_str)
-        end_time = datetime.fromisoformat(end_time_str)
+        start_time = _iso(start_time_str)
+        end_time = _iso(end_time_str)
     except ValueError:
-        return jsonify({'success': False, 'error': 'Invalid datetime format'}), 400
-
-    session = get_session()
-
-    try:
-        space = session.query(ParkingSpace).filter_by(space_number=space_number).first()
-        if not space:
-            return jsonify({'success': False, 'error': 'Space not found'}), 404
+        return ojson({'success': False, 'error': 'Invalid datetime format'}, 400)
 
-        # Calculate duration in hours
-        duration = (end_time - start_time).total_seconds() / 3600
-        total_cost = duration * space.hourly_rate
+    space = session.query(ParkingSpace).filter_by(space_number=space_number).first()
+    if not space:
+        return ojson({'success': False, 'error': 'Space not found'}, 404)
 
-        return jsonify({
-            'success': True,
-            'duration_hours': round(duration, 2),
-            'hourly_rate': space.hourly_rate,
-            'total_cost': round(total_cost, 2),
-            'currency': config.PAYMENT_CONFIG['currency']
-        })
+    # Calculate duration in hours
+    duration = (end_time - start_time).total_seconds() / 3600
+    total_cost = duration * space.hourly_rate
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'duration_hours': round(duration, 2),
+        'hourly_rate': space.hourly_rate,
+        'total_cost': round(total_cost, 2),
+        'currency': config.PAYMENT_CONFIG['currency']
+    })
 
 
 @app.route('/api/bookings/create', methods=['POST'])
-def create_booking():
+@with_session
+def create_booking(session):
     """Create a new booking"""
     data = request.json
 
@@ -470,320 +517,297 @@ def create_booking():
                        'vehicle_number', 'start_time', 'end_time']
 
     if not all(field in data for field in required_fields):
-        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        return ojson({'success': False, 'error': 'Missing required fields'}, 400)
 
     try:
-        start_time = datetime.fromisoformat(data['start_time'])
-        end_time = datetime.fromisoformat(data['end_time'])
+        start_time = _iso(data['start_time'])
+        end_time = _iso(data['end_time'])
     except ValueError:
-        return jsonify({'success': False, 'error': 'Invalid datetime format'}), 400
-
-    session = get_session()
-
-    try:
-        # Check if space exists
-        space = session.query(ParkingSpace).filter_by(
-            space_number=data['space_number']
-        ).first()
-
-        if not space:
-            return jsonify({'success': False, 'error': 'Space not found'}), 404
-
-        # Check if space is available for the time slot
-        overlapping = session.query(Booking).filter(
-            Booking.space_number == data['space_number'],
-            Booking.status.in_(['confirmed', 'active']),
-            Booking.start_time < end_time,
-            Booking.end_time > start_time
-        ).first()
-
-        if overlapping:
-            return jsonify({'success': False, 'error': 'Space not available for selected time'}), 409
-
-        # Calculate cost
-        duration = (end_time - start_time).total_seconds() / 3600
-        total_amount = duration * space.hourly_rate
-
-        # Create booking
-        booking = Booking(
-            booking_reference=generate_reference('BK'),
-            space_number=data['space_number'],
-            customer_name=data['customer_name'],
-            customer_email=data['customer_email'],
-            customer_phone=data.get('customer_phone'),
-            vehicle_number=data['vehicle_number'],
-            vehicle_type=data.get('vehicle_type', 'car'),
-            start_time=start_time,
-            end_time=end_time,
-            total_amount=total_amount,
-            status='pending',
-            payment_status='pending',
-            notes=data.get('notes')
-        )
-
-        session.add(booking)
-        session.commit()
+        return ojson({'success': False, 'error': 'Invalid datetime format'}, 400)
+
+    # Check if space exists
+    space = session.query(ParkingSpace).filter_by(
+        space_number=data['space_number']
+    ).first()
+
+    if not space:
+        return ojson({'success': False, 'error': 'Space not found'}, 404)
+
+    # Check if space is available for the time slot
+    overlapping = session.query(Booking).filter(
+        Booking.space_number == data['space_number'],
+        Booking.status.in_(['confirmed', 'active']),
+        Booking.start_time < end_time,
+        Booking.end_time > start_time
+    ).first()
+
+    if overlapping:
+        return ojson({'success': False, 'error': 'Space not available for selected time'}, 409)
+
+    # Calculate cost
+    duration = (end_time - start_time).total_seconds() / 3600
+    total_amount = duration * space.hourly_rate
+
+    # Create booking
+    booking = Booking(
+        booking_reference=generate_reference('BK'),
+        space_number=data['space_number'],
+        customer_name=data['customer_name'],
+        customer_email=data['customer_email'],
+        customer_phone=data.get('customer_phone'),
+        vehicle_number=data['vehicle_number'],
+        vehicle_type=data.get('vehicle_type', 'car'),
+        start_time=start_time,
+        end_time=end_time,
+        total_amount=total_amount,
+        status='pending',
+        payment_status='pending',
+        notes=data.get('notes')
+    )
 
-        return jsonify({
-            'success': True,
-            'booking': {
-                'booking_reference': booking.booking_reference,
-                'space_number': booking.space_number,
-                'start_time': booking.start_time.isoformat(),
-                'end_time': booking.end_time.isoformat(),
-                'total_amount': booking.total_amount,
-                'status': booking.status,
-                'payment_status': booking.payment_status
-            }
-        })
+    session.add(booking)
+    session.commit()
+    invalidate()
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'booking': BookingDTO.from_row(booking)
+    })
 
 
 @app.route('/api/bookings/<booking_reference>', methods=['GET'])
-def get_booking_details(booking_reference):
+@with_session
+def get_booking_details(session, booking_reference):
     """Get booking details"""
-    session = get_session()
-
-    try:
-        booking = session.query(Booking).filter_by(
-            booking_reference=booking_reference
-        ).first()
-
-        if not booking:
-            return jsonify({'success': False, 'error': 'Booking not found'}), 404
+    booking = session.query(Booking).options(
+        joinedload(Booking.payments)
+    ).filter_by(
+        booking_reference=booking_reference
+    ).first()
 
-        return jsonify({
-            'success': True,
-            'booking': {
-                'booking_reference': booking.booking_reference,
-                'space_number': booking.space_number,
-                'customer_name': booking.customer_name,
-                'customer_email': booking.customer_email,
-                'customer_phone': booking.customer_phone,
-                'vehicle_number': booking.vehicle_number,
-                'vehicle_type': booking.vehicle_type,
-                'start_time': booking.start_time.isoformat(),
-                'end_time': booking.end_time.isoformat(),
-                'total_amount': booking.total_amount,
-                'status': booking.status,
-                'payment_status': booking.payment_status,
-                'created_at': booking.created_at.isoformat()
-            }
-        })
+    if not booking:
+        return ojson({'success': False, 'error': 'Booking not found'}, 404)
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'booking': {
+            'booking_reference': booking.booking_reference,
+            'space_number': booking.space_number,
+            'customer_name': booking.customer_name,
+            'customer_email': booking.customer_email,
+            'customer_phone': booking.customer_phone,
+            'vehicle_number': booking.vehicle_number,
+            'vehicle_type': booking.vehicle_type,
+            'start_time': booking.start_time,
+            'end_time': booking.end_time,
+            'total_amount': booking.total_amount,
+            'status': booking.status,
+            'payment_status': booking.payment_status,
+            'created_at': booking.created_at
+        }
+    })
 
 
 @app.route('/api/bookings', methods=['GET'])
-def get_all_bookings():
+@with_session
+def get_all_bookings(session):
     """Get all bookings with optional filters"""
     status = request.args.get('status')
     from_date = request.args.get('from_date')
 
-    session = get_session()
+    query = session.query(Booking).options(joinedload(Booking.space))
 
-    try:
-        query = session.query(Booking)
-
-        if status:
-            query = query.filter(Booking.status == status)
-
-        if from_date:
-            try:
-                from_dt = datetime.fromisoformat(from_date)
-                query = query.filter(Booking.start_time >= from_dt)
-            except ValueError:
-                pass
-
-        bookings = query.order_by(Booking.created_at.desc()).limit(100).all()
-
-        data = [{
-            'booking_reference': b.booking_reference,
-            'space_number': b.space_number,
-            'customer_name': b.customer_name,
-            'customer_email': b.customer_email,
-            'vehicle_number': b.vehicle_number,
-            'start_time': b.start_time.isoformat(),
-            'end_time': b.end_time.isoformat(),
-            'total_amount': b.total_amount,
-            'status': b.status,
-            'payment_status': b.payment_status
-        } for b in bookings]
-
-        return jsonify({
-            'success': True,
-            'bookings': data,
-            'total': len(data)
-        })
+    if status:
+        query = query.filter(Booking.status == status)
+
+    if from_date:
+        try:
+            from_dt = _iso(from_date)
+            query = query.filter(Booking.start_time >= from_dt)
+        except ValueError:
+            pass
 
-    finally:
-        session.close()
+    bookings = query.order_by(Booking.created_at.desc()).limit(100).all()
+
+    data = [{
+        'booking_reference': b.booking_reference,
+        'space_number': b.space_number,
+        'customer_name': b.customer_name,
+        'customer_email': b.customer_email,
+        'vehicle_number': b.vehicle_number,
+        'start_time': b.start_time,
+        'end_time': b.end_time,
+        'total_amount': b.total_amount,
+        'status': b.status,
+        'payment_status': b.payment_status
+    } for b in bookings]
+
+    return ojson({
+        'success': True,
+        'bookings': data,
+        'total': len(data)
+    })
 
 
 @app.route('/api/bookings/<booking_reference>/cancel', methods=['POST'])
-def cancel_booking(booking_reference):
+@with_session
+def cancel_booking(session, booking_reference):
     """Cancel a booking"""
-    session = get_session()
-
-    try:
-        booking = session.query(Booking).filter_by(
-            booking_reference=booking_reference
-        ).first()
-
-        if not booking:
-            return jsonify({'success': False, 'error': 'Booking not found'}), 404
+    booking = session.query(Booking).filter_by(
+        booking_reference=booking_reference
+    ).first()
 
-        if booking.status in ['completed', 'cancelled']:
-            return jsonify({'success': False, 'error': 'Cannot cancel this booking'}), 400
+    if not booking:
+        return ojson({'success': False, 'error': 'Booking not found'}, 404)
 
-        # Check cancellation policy
-        time_until_start = (booking.start_time - datetime.now()).total_seconds() / 3600
-        if time_until_start < config.BOOKING_CONFIG['cancellation_hours']:
-            return jsonify({
-                'success': False,
-                'error': f'Cancellation must be done at least {config.BOOKING_CONFIG["cancellation_hours"]} hours before start time'
-            }), 400
+    if booking.status in ['completed', 'cancelled']:
+        return ojson({'success': False, 'error': 'Cannot cancel this booking'}, 400)
 
-        booking.status = 'cancelled'
-        booking.updated_at = datetime.now()
+    # Check cancellation policy
+    time_until_start = (booking.start_time - datetime.now()).total_seconds() / 3600
+    if time_until_start < config.BOOKING_CONFIG['cancellation_hours']:
+        return ojson({
+            'success': False,
+            'error': f'Cancellation must be done at least {config.BOOKING_CONFIG["cancellation_hours"]} hours before start time'
+        }, 400)
 
-        session.commit()
+    booking.status = 'cancelled'
+    booking.updated_at = datetime.now()
 
-        return jsonify({
-            'success': True,
-            'message': 'Booking cancelled successfully'
-        })
+    session.commit()
+    invalidate()
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'message': 'Booking cancelled successfully'
+    })
 
 
 # ============ PAYMENT ENDPOINTS ============
 
 @app.route('/api/payments/process', methods=['POST'])
-def process_payment():
+@with_session
+def process_payment(session):
     """Process payment for a booking (Demo mode)"""
     data = request.json
     booking_reference = data.get('booking_reference')
     payment_method = data.get('payment_method', 'card')
 
     if not booking_reference:
-        return jsonify({'success': False, 'error': 'booking_reference required'}), 400
+        return ojson({'success': False, 'error': 'booking_reference required'}, 400)
+
+    booking = session.query(Booking).filter_by(
+        booking_reference=booking_reference
+    ).first()
+
+    if not booking:
+        return ojson({'success': False, 'error': 'Booking not found'}, 404)
+
+    if booking.payment_status == 'paid':
+        return ojson({'success': False, 'error': 'Booking already paid'}, 400)
+
+    # Create payment record
+    payment = Payment(
+        payment_reference=generate_reference('PAY'),
+        booking_id=booking.id,
+        amount=booking.total_amount,
+        currency=config.PAYMENT_CONFIG['currency'],
+        payment_method=payment_method,
+        payment_gateway='demo' if config.PAYMENT_CONFIG['demo_mode'] else 'stripe',
+        status='processing',
+        customer_email=booking.customer_email
+    )
 
-    session = get_session()
+    session.add(payment)
+    session.flush()
 
-    try:
-        booking = session.query(Booking).filter_by(
-            booking_reference=booking_reference
-        ).first()
-
-        if not booking:
-            return jsonify({'success': False, 'error': 'Booking not found'}), 404
-
-        if booking.payment_status == 'paid':
-            return jsonify({'success': False, 'error': 'Booking already paid'}), 400
-
-        # Create payment record
-        payment = Payment(
-            payment_reference=generate_reference('PAY'),
-            booking_id=booking.id,
-            amount=booking.total_amount,
-            currency=config.PAYMENT_CONFIG['currency'],
-            payment_method=payment_method,
-            payment_gateway='demo' if config.PAYMENT_CONFIG['demo_mode'] else 'stripe',
-            status='processing',
-            customer_email=booking.customer_email
-        )
+    # In demo mode, automatically complete payment
+    if config.PAYMENT_CONFIG['demo_mode']:
+        payment.status = 'completed'
+        payment.completed_at = datetime.now()
+        payment.gateway_transaction_id = f"demo_txn_{random.randint(100000, 999999)}"
 
-        session.add(payment)
-        session.flush()
+        booking.payment_status = 'paid'
+        booking.payment_id = payment.payment_reference
+        booking.status = 'confirmed'
+    else:
+        # Commit the processing payment before calling Stripe, so no write
+        # transaction (and on SQLite no database lock) is held across the
+        # network round trip; the outcome is recorded in a second short one
+        session.commit()
 
-        # In demo mode, automatically complete payment
-        if config.PAYMENT_CONFIG['demo_mode']:
+        # Blocks this worker thread only; gthread workers keep serving others
+        try:
+            intent = create_payment_intent(
+                payment.amount, payment.currency,
+                payment.payment_reference, booking.customer_email
+            )
+        except PaymentGatewayError as e:
+            payment.status = 'failed'
+            payment.payment_metadata = orjson.dumps({'error': str(e)}).decode()
+            session.commit()
+            return ojson({'success': False, 'error': 'Payment gateway error'}, 502)
+
+        payment.gateway_transaction_id = intent['id']
+        if intent.get('status') == 'succeeded':
             payment.status = 'completed'
             payment.completed_at = datetime.now()
-            payment.gateway_transaction_id = f"demo_txn_{random.randint(100000, 999999)}"
-
             booking.payment_status = 'paid'
             booking.payment_id = payment.payment_reference
             booking.status = 'confirmed'
-        else:
-            # Here you would integrate with real payment gateway (Stripe, etc.)
-            # For now, we'll just mark as processing
-            pass
-
-        session.commit()
 
-        return jsonify({
-            'success': True,
-            'payment': {
-                'payment_reference': payment.payment_reference,
-                'amount': payment.amount,
-                'status': payment.status,
-                'booking_reference': booking_reference
-            }
-        })
+    session.commit()
+    invalidate()
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'payment': PaymentDTO.from_row(payment, booking_reference)
+    })
 
 
 @app.route('/api/payments/<payment_reference>', methods=['GET'])
-def get_payment_status(payment_reference):
+@with_session
+def get_payment_status(session, payment_reference):
     """Get payment status"""
-    session = get_session()
-
-    try:
-        payment = session.query(Payment).filter_by(
-            payment_reference=payment_reference
-        ).first()
-
-        if not payment:
-            return jsonify({'success': False, 'error': 'Payment not found'}), 404
+    payment = session.query(Payment).filter_by(
+        payment_reference=payment_reference
+    ).first()
 
-        return jsonify({
-            'success': True,
-            'payment': {
-                'payment_reference': payment.payment_reference,
-                'amount': payment.amount,
-                'currency': payment.currency,
-                'status': payment.status,
-                'payment_method': payment.payment_method,
-                'payment_time': payment.payment_time.isoformat(),
-                'completed_at': payment.completed_at.isoformat() if payment.completed_at else None
-            }
-        })
+    if not payment:
+        return ojson({'success': False, 'error': 'Payment not found'}, 404)
 
-    finally:
-        session.close()
+    return ojson({
+        'success': True,
+        'payment': {
+            'payment_reference': payment.payment_reference,
+            'amount': payment.amount,
+            'currency': payment.currency,
+            'status': payment.status,
+            'payment_method': payment.payment_method,
+            'payment_time': payment.payment_time,
+            'completed_at': payment.completed_at
+        }
+    })
 
 
 # ============ IMAGE ENDPOINTS ============
 
 @app.route('/api/parking/images/<space_number>', methods=['GET'])
-def get_space_image(space_number):
-    """Get image for a specific parking space"""
-    session = get_session()
-
-    try:
-        space = session.query(ParkingSpace).filter_by(
-            space_number=space_number
-        ).first()
-
-        if not space or not space.image_path:
-            return jsonify({'success': False, 'error': 'Image not found'}), 404
-
-        # Return image path for frontend to load
-        return jsonify({
-            'success': True,
-            'image_url': f'/static/parking_images/{space.image_path}'
-        })
-
-    finally:
-        session.close()
+@with_session
+def get_space_image(session, space_number):
+    """Serve the image for a specific parking space"""
+    image_path = session.query(ParkingSpace.image_path).filter(
+        ParkingSpace.space_number == space_number
+    ).scalar()
+
+    if not image_path:
+        return ojson({'success': False, 'error': 'Image not found'}, 404)
+
+    # Conditional, cacheable file response (sendfile when the server supports it)
+    return send_from_directory(
+        str(config.IMAGES_DIR), image_path,
+        conditional=True, etag=True, max_age=3600
+    )
 
 
 # ============ YOLO DETECTION ENDPOINTS ============
@@ -803,22 +827,51 @@ except Exception as e:
     print("  Install ultralytics to enable: pip install ultralytics")
 
 
+def save_annotated_image(annotated_image: np.ndarray, filename: str) -> dict:
+    """
+    Encode an annotated detection image once and save it to demo_results
+
+    Returns:
+        Response fields pointing at the saved JPEG, served by get_detection_result
+    """
+    _, buffer = cv2.imencode('.jpg', annotated_image)
+
+    output_path = config.RESULTS_DIR / filename
+    output_path.write_bytes(buffer.tobytes())
+
+    image_id = output_path.stem
+    return {
+        'annotated_image_id': image_id,
+        'annotated_image_url': url_for('get_detection_result', image_id=image_id),
+        'saved_path': str(output_path)
+    }
+
+
+@app.route('/api/detection/yolo/result/<image_id>.jpg', methods=['GET'])
+def get_detection_result(image_id):
+    """Serve an annotated detection image as raw JPEG bytes"""
+    return send_from_directory(
+        str(config.RESULTS_DIR), f'{image_id}.jpg',
+        mimetype='image/jpeg', conditional=True, max_age=3600
+    )
+
+
 @app.route('/api/detection/yolo/upload', methods=['POST'])
 def detect_from_upload():
     """
     Detect parking spaces from uploaded image using YOLO
 
     Request: multipart/form-data with 'image' file
-    Response: JSON with detections and annotated image
+    Response: JSON with detections and the annotated image's id and URL
     """
     if not yolo_detector or not yolo_detector.model_loaded:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': 'YOLO model not loaded. Please add trained model as best.pt'
-        }), 503
+        }, 503)
 
     if 'image' not in request.files:
-        return jsonify({'success': False, 'error': 'No image uploaded'}), 400
+        return ojson({'success': False, 'error': 'No image uploaded'}, 400)
 
     file = request.files['image']
 
@@ -834,20 +887,9 @@ def detect_from_upload():
         # Draw detections
         annotated_image = yolo_detector.draw_detections(image, detections)
 
-        # Save annotated image to demo_results
-        from datetime import datetime
-        from pathlib import Path
-        demo_results_dir = Path('demo_results')
-        demo_results_dir.mkdir(exist_ok=True)
-
+        # Save annotated image to demo_results; the client fetches it by id
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"detection_{timestamp}.jpg"
-        output_path = demo_results_dir / filename
-        cv2.imwrite(str(output_path), annotated_image)
-
-        # Convert to base64 for response
-        _, buffer = cv2.imencode('.jpg', annotated_image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
+        annotated = save_annotated_image(annotated_image, f"detection_{timestamp}_{os.urandom(4).hex()}.jpg")
 
         # Format detections for frontend
         formatted_detections = [{
@@ -858,11 +900,10 @@ def detect_from_upload():
             'column': d['column']
         } for d in detections]
 
-        return jsonify({
+        return ojson({
             'success': True,
             'detections': formatted_detections,
-            'annotated_image': f'data:image/jpeg;base64,{image_base64}',
-            'saved_path': str(output_path),
+            **annotated,
             'summary': {
                 'total': len(detections),
                 'occupied': sum(1 for d in detections if d['is_occupied']),
@@ -871,11 +912,12 @@ def detect_from_upload():
         })
 
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 
 @app.route('/api/detection/yolo/update-database', methods=['POST'])
-def update_database_from_yolo():
+@with_session
+def update_database_from_yolo(session):
     """
     Run YOLO detection on uploaded image and update database
 
@@ -883,16 +925,15 @@ def update_database_from_yolo():
     Response: JSON with updated parking space statuses
     """
     if not yolo_detector or not yolo_detector.model_loaded:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': 'YOLO model not loaded'
-        }), 503
+        }, 503)
 
     if 'image' not in request.files:
-        return jsonify({'success': False, 'error': 'No image uploaded'}), 400
+        return ojson({'success': False, 'error': 'No image uploaded'}, 400)
 
     file = request.files['image']
-    session = get_session()
 
     try:
         # Read image
@@ -905,8 +946,9 @@ def update_database_from_yolo():
 
         # Update database
         yolo_detector.update_database_from_detections(detections, session)
+        invalidate()
 
-        return jsonify({
+        return ojson({
             'success': True,
             'message': 'Database updated with YOLO detections',
             'updated_spaces': len(detections),
@@ -919,24 +961,21 @@ def update_database_from_yolo():
 
     except Exception as e:
         session.rollback()
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-    finally:
-        session.close()
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 
 @app.route('/api/detection/yolo/status', methods=['GET'])
 def get_yolo_status():
     """Get YOLO detector status"""
     if not yolo_detector:
-        return jsonify({
+        return ojson({
             'success': True,
             'yolo_available': False,
             'model_loaded': False,
             'message': 'YOLO not installed. Run: pip install ultralytics'
         })
 
-    return jsonify({
+    return ojson({
         'success': True,
         'yolo_available': True,
         'model_loaded': yolo_detector.model_loaded,
@@ -951,10 +990,10 @@ def run_demo_detection():
     and return results to display on layout automatically
     """
     if not yolo_detector or not yolo_detector.model_loaded:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': 'YOLO model not loaded'
-        }), 503
+        }, 503)
 
     try:
         from pathlib import Path
@@ -963,18 +1002,18 @@ def run_demo_detection():
         # Get demo images
         demo_images_dir = Path('data/parking_images')
         if not demo_images_dir.exists():
-            return jsonify({
+            return ojson({
                 'success': False,
                 'error': 'No demo images found'
-            }), 404
+            }, 404)
 
         image_files = list(demo_images_dir.glob('*.jpg')) + list(demo_images_dir.glob('*.jpeg'))
 
         if not image_files:
-            return jsonify({
+            return ojson({
                 'success': False,
                 'error': 'No demo images found'
-            }), 404
+            }, 404)
 
         # Pick random demo image
         demo_image_path = random.choice(image_files)
@@ -986,19 +1025,9 @@ def run_demo_detection():
         # Draw detections
         annotated_image = yolo_detector.draw_detections(image, detections)
 
-        # Save to demo_results
-        from datetime import datetime
-        demo_results_dir = Path('demo_results')
-        demo_results_dir.mkdir(exist_ok=True)
-
+        # Save to demo_results; the client fetches it by id
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"demo_{demo_image_path.stem}_{timestamp}.jpg"
-        output_path = demo_results_dir / filename
-        cv2.imwrite(str(output_path), annotated_image)
-
-        # Convert to base64
-        _, buffer = cv2.imencode('.jpg', annotated_image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
+        annotated = save_annotated_image(annotated_image, f"demo_{demo_image_path.stem}_{timestamp}.jpg")
 
         # Format detections
         formatted_detections = [{
@@ -1009,12 +1038,11 @@ def run_demo_detection():
             'column': d['column']
         } for d in detections]
 
-        return jsonify({
+        return ojson({
             'success': True,
             'detections': formatted_detections,
-            'annotated_image': f'data:image/jpeg;base64,{image_base64}',
+            **annotated,
             'demo_image_name': demo_image_path.name,
-            'saved_path': str(output_path),
             'summary': {
                 'total': len(detections),
                 'occupied': sum(1 for d in detections if d['is_occupied']),
@@ -1023,14 +1051,15 @@ def run_demo_detection():
         })
 
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 
 if __name__ == '__main__':
     # Initialize database
     init_db()
 
-    # Run app
+    # Run app (Werkzeug development server)
+    print("Starting development server. For production run: gunicorn -c gunicorn.conf.py app:app")
     app.run(
         host=config.API_CONFIG['host'],
         port=config.API_CONFIG['port'],
@@ -0,0 +1,207 @@
+"""
+Response Cache - Redis-backed caching for the hot dashboard endpoints
+"""
+import hashlib
+import time
+from functools import wraps
+from flask import request, make_response, Response
+import config
+
+# Redis is optional - endpoints fall through to the database without it
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    print("Warning: redis not installed. Response caching disabled. Install with: pip install redis")
+
+# Cache keys for the polled dashboard snapshots
+STATUS_KEY = 'status:v1'
+STATS_KEY = 'stats:v1'
+EVENTS_KEY = 'events:v1'
+SNAPSHOT_KEYS = (STATUS_KEY, STATS_KEY, EVENTS_KEY)
+
+# Precomputed occupancy predictions, refreshed by predict_worker.py
+PREDICTIONS_KEY = 'predictions:v1'
+
+_client = None
+
+
+def get_client():
+    """Get the shared Redis client, or None if caching is unavailable"""
+    global _client
+
+    if not REDIS_AVAILABLE or not config.CACHE_CONFIG['enabled']:
+        return None
+
+    if _client is None:
+        _client = redis.Redis.from_url(
+            config.CACHE_CONFIG['redis_url'],
+            socket_timeout=config.CACHE_CONFIG['socket_timeout'],
+            socket_connect_timeout=config.CACHE_CONFIG['socket_timeout']
+        )
+
+    return _client
+
+
+def _cache_key(key: str) -> str:
+    """Build the cache key for the current request, including query args"""
+    if request.query_string:
+        return f"{key}:{request.query_string.decode()}"
+    return key
+
+
+def _is_not_modified(etag: str) -> bool:
+    """Check If-None-Match, allowing for a compression suffix on the tag"""
+    return any(tag.split(':')[0] == etag for tag in request.if_none_match)
+
+
+def _not_modified_response(etag: str, cache_status: str) -> Response:
+    """Build an empty 304 response for an unchanged entry"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['X-Cache'] = cache_status
+    return response
+
+
+def _response_from_entry(entry: dict, cache_status: str) -> Response:
+    """Build a response from a cached entry"""
+    etag = entry[b'etag'].decode()
+    if _is_not_modified(etag):
+        return _not_modified_response(etag, cache_status)
+
+    response = Response(
+        entry[b'body'],
+        status=int(entry[b'status']),
+        mimetype='application/json'
+    )
+    response.set_etag(etag)
+    response.headers['X-Cache'] = cache_status
+    return response
+
+
+def _store(client, cache_key: str, response: Response, ttl: float) -> str:
+    """Store a rendered response along with its freshness metadata, returning its ETag"""
+    body = response.get_data()
+    now = time.time()
+    etag = hashlib.sha1(body).hexdigest()
+
+    pipe = client.pipeline()
+    pipe.hset(cache_key, mapping={
+        'body': body,
+        'etag': etag,
+        'generated_at': now,
+        'stale_at': now + ttl,
+        'status': response.status_code
+    })
+    # Keep the entry past its freshness window as a stale fallback
+    pipe.expire(cache_key, config.CACHE_CONFIG['stale_ttl'])
+    pipe.execute()
+
+    response.set_etag(etag)
+    return etag
+
+
+def cached(key: str, policy: str = 'short'):
+    """
+    Cache a GET endpoint's JSON response in Redis
+
+    Fresh entries are served without calling the view, and as an empty 304
+    when the client already has the same ETag. Expired entries are kept for
+    `stale_ttl` seconds and served if the view raises or returns a 5xx
+    (e.g. the database is unreachable).
+
+    Args:
+        key: Base cache key for the endpoint
+        policy: Freshness policy name from CACHE_CONFIG['policies']
+    """
+    ttl = config.CACHE_CONFIG['policies'][policy]
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            client = get_client()
+            if client is None:
+                return fn(*args, **kwargs)
+
+            cache_key = _cache_key(key)
+
+            try:
+                entry = client.hgetall(cache_key)
+            except redis.RedisError:
+                return fn(*args, **kwargs)
+
+            if entry and float(entry[b'stale_at']) > time.time():
+                return _response_from_entry(entry, 'HIT')
+
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                if entry:
+                    return _response_from_entry(entry, 'STALE')
+                raise
+
+            if response.status_code >= 500 and entry:
+                return _response_from_entry(entry, 'STALE')
+
+            if response.status_code == 200:
+                try:
+                    etag = _store(client, cache_key, response, ttl)
+                except redis.RedisError:
+                    return response
+
+                if _is_not_modified(etag):
+                    return _not_modified_response(etag, 'MISS')
+                response.headers['X-Cache'] = 'MISS'
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*keys: str):
+    """
+    Drop cached responses after a state change
+
+    Args:
+        keys: Base cache keys to drop (defaults to all dashboard snapshots)
+    """
+    client = get_client()
+    if client is None:
+        return
+
+    keys = keys or SNAPSHOT_KEYS
+
+    try:
+        names = list(keys)
+        for key in keys:
+            names.extend(client.scan_iter(match=f'{key}:*'))
+        client.delete(*names)
+    except redis.RedisError:
+        pass
+
+
+def get_bytes(key: str):
+    """Get a raw cached value, or None on a miss or if caching is unavailable"""
+    client = get_client()
+    if client is None:
+        return None
+
+    try:
+        return client.get(key)
+    except redis.RedisError:
+        return None
+
+
+def set_bytes(key: str, value: bytes, ttl: int):
+    """Store a raw value with an expiry in seconds"""
+    client = get_client()
+    if client is None:
+        return
+
+    try:
+        client.set(key, value, ex=ttl)
+    except redis.RedisError:
+        pass
@@ -0,0 +1,81 @@
+"""
+Camera Stream - Background frame capture for the live monitoring loops
+"""
+import queue
+import threading
+import cv2
+from typing import Tuple
+
+
+class LatestFrameReader:
+    """
+    Reads frames from a camera on a background thread, keeping only the newest
+
+    Capture (and optional resize) overlaps with detection and display in the
+    caller's thread; OpenCV releases the GIL while it works. Frames the caller
+    is too slow to take are dropped, so latency doesn't build up.
+    """
+
+    def __init__(self, source=0, size: Tuple[int, int] = None):
+        """
+        Args:
+            source: cv2.VideoCapture source (camera index, file or stream URL)
+            size: Optional (width, height) to resize frames to on the capture thread
+        """
+        self.cap = cv2.VideoCapture(source)
+        self.size = size
+
+        if size is not None:
+            # Ask the camera for the target resolution so frames rarely need resizing
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        self._frames = queue.Queue(maxsize=1)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put_latest(self, frame):
+        """Replace any frame the consumer hasn't taken yet"""
+        try:
+            self._frames.get_nowait()
+        except queue.Empty:
+            pass
+        self._frames.put(frame)
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                if self.size is not None and frame.shape[1::-1] != self.size:
+                    frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+
+                self._put_latest(frame)
+        finally:
+            # Released here so it can never race a cap.read() in progress
+            self.cap.release()
+
+            # None marks the end of the stream
+            self._put_latest(None)
+
+    def read(self, timeout: float = 5.0):
+        """
+        Wait for the next frame
+
+        Returns:
+            (ret, frame) like cv2.VideoCapture.read(); ret is False once the
+            stream has ended or no frame arrived within `timeout` seconds
+        """
+        try:
+            frame = self._frames.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+        return frame is not None, frame
+
+    def release(self):
+        """Stop the capture thread, which releases the camera once its read returns"""
+        self._stopped.set()
+        self._thread.join()
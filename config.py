@@ -7,13 +7,22 @@ BASE_DIR = Path(__file__).parent
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR}/parking.db')
 
+# Connection pool settings (per worker process)
+DB_POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+    'pool_timeout': 30,  # seconds to wait for a free connection
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 3600)),  # seconds, below server idle timeouts
+}
+
 # Parking lot configuration
 PARKING_LOT_CONFIG = {
     'total_spaces': 40,
     'rows': 5,
     'columns': 8,
     'camera_fps': 30,
-    'detection_interval': 5  # seconds
+    'detection_interval': 5,  # seconds
+    'preview_detect_every': 10  # frames between detections in the live preview
 }
 
 # Model configuration
@@ -22,7 +31,9 @@ MODEL_CONFIG = {
     'scaler_path': BASE_DIR / 'models' / 'scaler.pkl',
     'input_features': ['hour', 'day_of_week', 'is_weekend', 'current_occupancy',
                        'avg_occupancy_last_hour', 'avg_occupancy_same_hour_last_week'],
-    'prediction_horizon': 6  # hours
+    'prediction_horizon': 6,  # hours
+    'prediction_refresh_interval': 60,  # seconds between predict_worker.py runs
+    'prediction_cache_ttl': 120  # seconds cached predictions stay valid
 }
 
 # API configuration
@@ -32,13 +43,32 @@ API_CONFIG = {
     'debug': True
 }
 
+# Response cache configuration (Redis)
+CACHE_CONFIG = {
+    'enabled': os.getenv('CACHE_ENABLED', '1') == '1',
+    'redis_url': os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+    'socket_timeout': 0.25,  # seconds
+    'policies': {
+        'short': 2,  # seconds a cached response stays fresh
+    },
+    'stale_ttl': 300  # seconds a last-good response is kept as fallback
+}
+
 # Image processing configuration
 IMAGE_CONFIG = {
     'image_width': 1920,
     'image_height': 1080,
     'parking_space_width': 100,
     'parking_space_height': 200,
-    'confidence_threshold': 0.7
+    'confidence_threshold': 0.7,
+    'detection_scale': 0.5  # downscale factor applied before occupancy preprocessing
+}
+
+# YOLO inference configuration
+YOLO_CONFIG = {
+    'device': os.getenv('YOLO_DEVICE'),  # e.g. 'cuda:0', '0' or 'cpu'; picks CUDA when available if unset
+    'half': True,  # FP16 inference on CUDA devices
+    'tensorrt': os.getenv('YOLO_TENSORRT', '0') == '1',  # export and reuse a TensorRT .engine on CUDA
 }
 
 # Paths
@@ -47,6 +77,7 @@ DATA_DIR = BASE_DIR / 'data'
 STATIC_DIR = BASE_DIR / 'static'
 TEMPLATES_DIR = BASE_DIR / 'templates'
 IMAGES_DIR = DATA_DIR / 'parking_images'
+RESULTS_DIR = BASE_DIR / 'demo_results'  # annotated YOLO detection results
 
 # Payment configuration
 PAYMENT_CONFIG = {
@@ -55,6 +86,8 @@ PAYMENT_CONFIG = {
     'demo_mode': True,  # Set to False for real payment gateway
     'stripe_public_key': os.getenv('STRIPE_PUBLIC_KEY', 'pk_test_demo'),
     'stripe_secret_key': os.getenv('STRIPE_SECRET_KEY', 'sk_test_demo'),
+    'gateway_timeout': 10,  # seconds
+    'gateway_pool_size': 10,  # pooled connections per worker process
 }
 
 # Booking configuration
@@ -66,5 +99,5 @@ BOOKING_CONFIG = {
 }
 
 # Create directories if they don't exist
-for directory in [MODELS_DIR, DATA_DIR, STATIC_DIR, TEMPLATES_DIR, IMAGES_DIR]:
+for directory in [MODELS_DIR, DATA_DIR, STATIC_DIR, TEMPLATES_DIR, IMAGES_DIR, RESULTS_DIR]:
     directory.mkdir(exist_ok=True)
@@ -1,13 +1,48 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index, event, func, case, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
 from datetime import datetime
-from config import DATABASE_URL
+from itertools import product
+from config import DATABASE_URL, DB_POOL_CONFIG
 
 Base = declarative_base()
-engine = create_engine(DATABASE_URL)
+
+if DATABASE_URL.startswith('sqlite'):
+    # Pooled connections shared across request threads
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_CONFIG['pool_size'],
+        max_overflow=DB_POOL_CONFIG['max_overflow'],
+        pool_timeout=DB_POOL_CONFIG['pool_timeout'],
+        pool_pre_ping=True,
+        connect_args={'check_same_thread': False}
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so readers don't block on writers, and memory-map the file"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA mmap_size=268435456')  # 256 MB
+        cursor.execute('PRAGMA cache_size=-65536')  # 64 MB
+        cursor.close()
+else:
+    # Keep warm connections and recycle them before the server drops idle ones
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_CONFIG['pool_size'],
+        max_overflow=DB_POOL_CONFIG['max_overflow'],
+        pool_timeout=DB_POOL_CONFIG['pool_timeout'],
+        pool_recycle=DB_POOL_CONFIG['pool_recycle'],
+        pool_pre_ping=True
+    )
+
 SessionLocal = sessionmaker(bind=engine)
 
+# Thread-local sessions for the web app, removed at the end of each request
+Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
 
 class ParkingSpace(Base):
     """Model for individual parking spaces"""
@@ -20,10 +55,25 @@ class ParkingSpace(Base):
     is_occupied = Column(Boolean, default=False)
     vehicle_type = Column(String(50), nullable=True)
     last_updated = Column(DateTime, default=datetime.utcnow)
-    coordinates = Column(String(100))  # Store as "x1,y1,x2,y2"
+    # Bounding box in image pixels
+    x1 = Column(Integer, nullable=True)
+    y1 = Column(Integer, nullable=True)
+    x2 = Column(Integer, nullable=True)
+    y2 = Column(Integer, nullable=True)
     image_path = Column(String(255), nullable=True)  # Path to parking spot image
     hourly_rate = Column(Float, default=5.0)  # Hourly parking rate
 
+    @property
+    def coordinates(self):
+        """Bounding box as (x1, y1, x2, y2), or None if not set"""
+        if self.x1 is None:
+            return None
+        return (self.x1, self.y1, self.x2, self.y2)
+
+    @coordinates.setter
+    def coordinates(self, value):
+        self.x1, self.y1, self.x2, self.y2 = value if value is not None else (None,) * 4
+
 
 class OccupancyHistory(Base):
     """Model for tracking occupancy over time"""
@@ -36,6 +86,10 @@ class OccupancyHistory(Base):
     available_spaces = Column(Integer, nullable=False)
     occupancy_rate = Column(Float, nullable=False)
 
+    __table_args__ = (
+        Index('ix_hist_ts', 'timestamp'),
+    )
+
 
 class ParkingEvent(Base):
     """Model for tracking parking events (entry/exit)"""
@@ -48,6 +102,13 @@ class ParkingEvent(Base):
     vehicle_type = Column(String(50), nullable=True)
     confidence = Column(Float, nullable=True)
 
+    __table_args__ = (
+        # Recent-events listing and today's entry/exit counts
+        Index('ix_events_ts_type', timestamp.desc(), event_type),
+        # Per-space recent events
+        Index('ix_events_space_ts', space_number, timestamp),
+    )
+
 
 class OccupancyPrediction(Base):
     """Model for storing occupancy predictions"""
@@ -63,14 +124,74 @@ class OccupancyPrediction(Base):
 def init_db():
     """Initialize database and create tables"""
     Base.metadata.create_all(engine)
+
+    # create_all skips indexes and columns on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    _migrate_space_coordinates()
+
     print("Database initialized successfully!")
 
 
+def _migrate_space_coordinates():
+    """Move legacy "x1,y1,x2,y2" coordinate strings into integer columns"""
+    columns = {c['name'] for c in inspect(engine).get_columns('parking_spaces')}
+    box_columns = ('x1', 'y1', 'x2', 'y2')
+
+    with engine.begin() as connection:
+        for name in box_columns:
+            if name not in columns:
+                connection.execute(text(f'ALTER TABLE parking_spaces ADD COLUMN {name} INTEGER'))
+
+        if 'coordinates' not in columns:
+            return
+
+        rows = connection.execute(text(
+            "SELECT id, coordinates FROM parking_spaces "
+            "WHERE coordinates IS NOT NULL AND coordinates != '' AND x1 IS NULL"
+        )).all()
+
+        params = [
+            dict(zip(box_columns, map(int, coordinates.split(','))), id=space_id)
+            for space_id, coordinates in rows
+        ]
+        if params:
+            connection.execute(text(
+                'UPDATE parking_spaces SET x1 = :x1, y1 = :y1, x2 = :x2, y2 = :y2 WHERE id = :id'
+            ), params)
+
+
 def get_session():
     """Get database session"""
     return SessionLocal()
 
 
+def build_space_grid(rows: int, cols: int) -> list:
+    """Build parking space rows (P001, P002, ...) for a rows x cols lot"""
+    # One shared timestamp so the executemany doesn't call the column default per row
+    now = datetime.utcnow()
+
+    return [{
+        'space_number': f'P{i:03d}',
+        'row': row,
+        'column': col,
+        'is_occupied': False,
+        'last_updated': now
+    } for i, (row, col) in enumerate(product(range(rows), range(cols)), start=1)]
+
+
+def get_occupancy_counts(session):
+    """Get (total, occupied) space counts with a single aggregate query"""
+    total, occupied = session.query(
+        func.count(ParkingSpace.id),
+        func.coalesce(func.sum(case((ParkingSpace.is_occupied == True, 1), else_=0)), 0)
+    ).one()
+
+    return total, occupied
+
+
 class Booking(Base):
     """Model for parking space bookings/reservations"""
     __tablename__ = 'bookings'
@@ -104,6 +225,22 @@ class Booking(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Relationships (space_number is not a foreign key, so join explicitly)
+    space = relationship(
+        'ParkingSpace',
+        primaryjoin='Booking.space_number == ParkingSpace.space_number',
+        foreign_keys=[space_number],
+        viewonly=True
+    )
+    payments = relationship('Payment', back_populates='booking')
+
+    __table_args__ = (
+        # Covers the availability / overlap checks
+        Index('ix_bookings_overlap', 'space_number', 'status', 'start_time', 'end_time'),
+        # Booking list filtered by from_date
+        Index('ix_bookings_start', 'start_time'),
+    )
+
 
 class Payment(Base):
     """Model for payment transactions"""
@@ -133,6 +270,8 @@ class Payment(Base):
     # Additional data
     payment_metadata = Column(Text, nullable=True)  # JSON string for additional data
 
+    booking = relationship('Booking', back_populates='payments')
+
 
 if __name__ == "__main__":
     init_db()
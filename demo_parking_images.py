@@ -3,9 +3,13 @@ Demo script to showcase YOLO detection on your parking images
 """
 
 from yolo_parking_detector import YOLOParkingDetector
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-from pathlib import Path
 import os
+import config
+
+BATCH_SIZE = 8  # images per model call
+JPEG_QUALITY = 85  # annotated output quality, faster to encode than the default 95
 
 def demo_parking_detection():
     """Run YOLO detection on all parking images"""
@@ -21,7 +25,7 @@ def demo_parking_detection():
     print("")
     
     # Find all parking images
-    image_dir = Path('data/parking_images')
+    image_dir = config.IMAGES_DIR
     
     if not image_dir.exists():
         print(f"❌ Directory not found: {image_dir}")
@@ -38,49 +42,74 @@ def demo_parking_detection():
     print("")
     
     # Create output directory
-    output_dir = Path('demo_results')
+    output_dir = config.RESULTS_DIR
     output_dir.mkdir(exist_ok=True)
     
-    # Process each image
-    for idx, image_path in enumerate(images, 1):
-        print(f"\n[{idx}/{len(images)}] Processing: {image_path.name}")
-        print("-" * 60)
-        
-        # Run detection
-        detections = detector.detect_from_image(str(image_path))
-        
-        if not detections:
-            print("  No detections found")
-            continue
-        
-        # Show summary
-        total = len(detections)
-        occupied = sum(1 for d in detections if d['is_occupied'])
-        available = total - occupied
-        
-        print(f"  ✓ Detected: {total} spaces")
-        print(f"  ✓ Occupied: {occupied} ({occupied/total*100:.1f}%)")
-        print(f"  ✓ Available: {available} ({available/total*100:.1f}%)")
-        
-        # Show top 5 detections
-        print(f"\n  Top detections:")
-        for det in detections[:5]:
-            status = "🔴 OCCUPIED" if det['is_occupied'] else "🟢 EMPTY"
-            print(f"    {det['space_number']}: {status} (conf: {det['confidence']:.2f})")
-        
-        # Draw and save annotated image
-        image = cv2.imread(str(image_path))
-        annotated = detector.draw_detections(image, detections)
-        
-        output_path = output_dir / f"annotated_{image_path.name}"
-        cv2.imwrite(str(output_path), annotated)
-        print(f"\n  💾 Saved: {output_path}")
+    # Decode images on a thread pool (cv2 releases the GIL) so disk reads
+    # overlap with inference on the previous batch
+    pool = ThreadPoolExecutor(max_workers=min(BATCH_SIZE, os.cpu_count() or 1))
+
+    def decode(paths):
+        return [pool.submit(cv2.imread, str(path)) for path in paths]
+
+    # Annotation buffer reused across same-sized images
+    annotated = None
+
+    # Process images in batches, decoding only the next batch ahead, so at
+    # most two batches of decoded images are in memory at once
+    pending = decode(images[:BATCH_SIZE])
+    for start in range(0, len(images), BATCH_SIZE):
+        batch_paths = images[start:start + BATCH_SIZE]
+        batch_images = [future.result() for future in pending]
+        pending = decode(images[start + BATCH_SIZE:start + 2 * BATCH_SIZE])
+        batch_detections = detector.detect_from_frames(
+            [image for image in batch_images if image is not None]
+        )
+        batch_detections = iter(batch_detections)
+
+        for idx, (image_path, image) in enumerate(zip(batch_paths, batch_images), start + 1):
+            print(f"\n[{idx}/{len(images)}] Processing: {image_path.name}")
+            print("-" * 60)
+
+            if image is None:
+                print("  Could not read image")
+                continue
+
+            detections = next(batch_detections)
+
+            if not detections:
+                print("  No detections found")
+                continue
+
+            # Show summary
+            total = len(detections)
+            occupied = sum(1 for d in detections if d['is_occupied'])
+            available = total - occupied
+
+            print(f"  ✓ Detected: {total} spaces")
+            print(f"  ✓ Occupied: {occupied} ({occupied/total*100:.1f}%)")
+            print(f"  ✓ Available: {available} ({available/total*100:.1f}%)")
+
+            # Show top 5 detections
+            print(f"\n  Top detections:")
+            for det in detections[:5]:
+                status = "🔴 OCCUPIED" if det['is_occupied'] else "🟢 EMPTY"
+                print(f"    {det['space_number']}: {status} (conf: {det['confidence']:.2f})")
+
+            # Draw on the already decoded image and save
+            annotated = detector.draw_detections(image, detections, out=annotated)
+
+            output_path = output_dir / f"annotated_{image_path.name}"
+            cv2.imwrite(str(output_path), annotated, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            print(f"\n  💾 Saved: {output_path}")
+
+    pool.shutdown()
     
     print("\n" + "=" * 60)
     print(f"✓ Demo complete! Results saved in: {output_dir}/")
     print("")
     print("Next steps:")
-    print("  1. View annotated images in demo_results/")
+    print(f"  1. View annotated images in {output_dir}/")
     print("  2. Upload images via API to update database")
     print("  3. Check dashboard at http://localhost:5000")
 
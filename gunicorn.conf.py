@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for production deployment
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+from itertools import count
+import config
+
+bind = f"{config.API_CONFIG['host']}:{config.API_CONFIG['port']}"
+
+# Handlers mostly wait on the database, so threaded workers overlap that I/O
+workers = int(os.getenv('GUNICORN_WORKERS', 2 * os.cpu_count() + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Load models once in the master and share them with the forked workers
+# (YOLO moves to CUDA in each worker on its first inference)
+preload_app = True
+timeout = 60  # YOLO inference on CPU can be slow
+
+
+def on_starting(server):
+    """Create database tables before the workers start"""
+    from database import init_db
+    init_db()
+
+
+def pre_fork(server, worker):
+    """Give the new worker the lowest slot number no live worker holds"""
+    taken = {getattr(w, 'slot', None) for w in server.WORKERS.values()}
+    worker.slot = next(slot for slot in count() if slot not in taken)
+
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master process"""
+    from database import engine
+    engine.dispose(close=False)
+
+    # Booking/payment references carry the worker slot instead of the pid,
+    # which can repeat modulo 256 across workers
+    import app
+    app.init_reference_worker(worker.slot)
@@ -1,13 +1,37 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
 from datetime import datetime, timedelta
 import joblib
+import time
+from functools import lru_cache
 from typing import List, Dict
 import config
-from database import get_session, OccupancyHistory
+from sqlalchemy import select, event
+from database import engine, get_session, get_occupancy_counts, OccupancyHistory
+
+# Recent history frames keyed by `days`: {days: (loaded_at, DataFrame)}
+_history_cache = {}
+HISTORY_CACHE_TTL = 60  # seconds
+
+
+@lru_cache(maxsize=4)
+def _load_joblib(path: str, mtime: float):
+    """Load a joblib file once per (path, mtime), so retraining is picked up"""
+    return joblib.load(path)
+
+
+def clear_history_cache():
+    """Drop cached history frames (bulk inserts bypass the ORM insert event)"""
+    _history_cache.clear()
+
+
+@event.listens_for(OccupancyHistory, 'after_insert')
+def _on_history_insert(mapper, connection, target):
+    """Drop cached history frames when a new snapshot is recorded"""
+    clear_history_cache()
 
 
 class OccupancyPredictor:
@@ -43,10 +67,12 @@ class OccupancyPredictor:
                 window=36, min_periods=1
             ).mean()
 
-            # Weekly patterns
-            df['avg_occupancy_same_hour_last_week'] = df.groupby('hour')['occupancy_rate'].transform(
-                lambda x: x.shift(7 * 24 * 12).fillna(x.mean())
-            )
+            # Weekly patterns: one week back is 7 * 24 * 12 five-minute rows,
+            # falling back to the mean for that hour where there is no history
+            hourly_mean = df.groupby('hour')['occupancy_rate'].transform('mean')
+            df['avg_occupancy_same_hour_last_week'] = df['occupancy_rate'].shift(
+                7 * 24 * 12
+            ).fillna(hourly_mean)
 
         # Current occupancy
         if 'occupied_spaces' in df.columns:
@@ -82,174 +108,177 @@ class OccupancyPredictor:
             X, y, test_size=0.2, random_state=42
         )
 
-        # Scale features
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
-
-        # Train ensemble model
-        print("Training Random Forest model...")
-        rf_model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
-        )
-        rf_model.fit(X_train_scaled, y_train)
-
-        print("Training Gradient Boosting model...")
-        gb_model = GradientBoostingRegressor(
-            n_estimators=100,
-            max_depth=5,
-            learning_rate=0.1,
+        # Tree models are invariant to feature scaling, so no scaler is fitted
+        self.scaler = None
+        X_train = X_train.to_numpy()
+        X_test = X_test.to_numpy()
+
+        # Histogram-based boosting: binned splits train far faster than
+        # RandomForest/GradientBoosting and hold the same accuracy here
+        print("Training Histogram Gradient Boosting model...")
+        self.model = HistGradientBoostingRegressor(
+            max_iter=200,
+            max_depth=8,
+            learning_rate=0.05,
+            early_stopping=True,
+            validation_fraction=0.2,
             random_state=42
         )
-        gb_model.fit(X_train_scaled, y_train)
-
-        # Use the better performing model
-        rf_score = rf_model.score(X_test_scaled, y_test)
-        gb_score = gb_model.score(X_test_scaled, y_test)
-
-        print(f"Random Forest R² Score: {rf_score:.4f}")
-        print(f"Gradient Boosting R² Score: {gb_score:.4f}")
+        self.model.fit(X_train, y_train)
 
-        if rf_score > gb_score:
-            self.model = rf_model
-            print("Selected Random Forest model")
-        else:
-            self.model = gb_model
-            print("Selected Gradient Boosting model")
+        test_score = self.model.score(X_test, y_test)
+        print(f"Histogram Gradient Boosting R² Score: {test_score:.4f}")
 
-        # Feature importance
+        # Feature importance (HistGradientBoosting has no impurity-based importances)
+        importances = permutation_importance(
+            self.model, X_test, y_test, n_repeats=5, random_state=42
+        )
         feature_importance = pd.DataFrame({
             'feature': available_features,
-            'importance': self.model.feature_importances_
+            'importance': importances.importances_mean
         }).sort_values('importance', ascending=False)
 
         print("\nFeature Importance:")
         print(feature_importance)
 
         return {
-            'train_score': self.model.score(X_train_scaled, y_train),
-            'test_score': self.model.score(X_test_scaled, y_test),
+            'train_score': self.model.score(X_train, y_train),
+            'test_score': test_score,
             'feature_importance': feature_importance.to_dict('records')
         }
 
-    def predict(self, features: Dict) -> float:
-        """Predict occupancy for given features"""
-        if self.model is None or self.scaler is None:
+    def predict_batch(self, df: pd.DataFrame) -> np.ndarray:
+        """Predict occupancy for every row of a feature DataFrame in one model call"""
+        if self.model is None:
             raise ValueError("Model not trained or loaded")
 
-        # Create DataFrame from features
-        df = pd.DataFrame([features])
+        # Select and order features, filling any missing ones with 0
+        X = df.reindex(columns=self.feature_columns, fill_value=0).to_numpy(dtype=np.float64)
 
-        # Ensure all required features are present
-        for col in self.feature_columns:
-            if col not in df.columns:
-                df[col] = 0
+        # Only models saved by older versions were trained on scaled features
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
 
-        # Select and order features
-        X = df[self.feature_columns]
+        predictions = self.model.predict(X)
 
-        # Scale features
-        X_scaled = self.scaler.transform(X)
+        # Ensure predictions are within valid range (0-1 for occupancy rate)
+        return np.clip(predictions, 0, 1)
 
-        # Predict
-        prediction = self.model.predict(X_scaled)[0]
-
-        # Ensure prediction is within valid range (0-1 for occupancy rate)
-        prediction = max(0, min(1, prediction))
-
-        return prediction
+    def predict(self, features: Dict) -> float:
+        """Predict occupancy for given features"""
+        return self.predict_batch(pd.DataFrame([features]))[0]
 
     def predict_future_occupancy(
         self, hours_ahead: int = 6, current_data: Dict = None
     ) -> List[Dict]:
         """Predict occupancy for the next N hours"""
-        predictions = []
         now = datetime.now()
+        target_times = [now + timedelta(hours=h) for h in range(1, hours_ahead + 1)]
+        day_of_week = np.array([t.weekday() for t in target_times])
+
+        df = pd.DataFrame({
+            'hour': [t.hour for t in target_times],
+            'day_of_week': day_of_week,
+            'is_weekend': (day_of_week >= 5).astype(int)
+        })
+
+        # Current data applies to every target hour
+        if current_data:
+            df = df.assign(**current_data)
+
+        rates = self.predict_batch(df)
+        total_spaces = config.PARKING_LOT_CONFIG['total_spaces']
+
+        return [{
+            'target_time': target_time,
+            'predicted_occupancy_rate': rate,
+            'predicted_occupied_spaces': int(rate * total_spaces),
+            'predicted_available_spaces': int((1 - rate) * total_spaces)
+        } for target_time, rate in zip(target_times, rates)]
+
+    def predict_from_database(self, hours_ahead: int = 6) -> List[Dict]:
+        """Predict occupancy for the next N hours from the current lot state"""
+        session = get_session()
 
-        for hour_offset in range(1, hours_ahead + 1):
-            target_time = now + timedelta(hours=hour_offset)
+        try:
+            total, occupied = get_occupancy_counts(session)
+        finally:
+            session.close()
 
-            features = {
-                'hour': target_time.hour,
-                'day_of_week': target_time.weekday(),
-                'is_weekend': 1 if target_time.weekday() >= 5 else 0,
+        return self.predict_future_occupancy(
+            hours_ahead=hours_ahead,
+            current_data={
+                'current_occupancy': occupied,
+                'avg_occupancy_last_hour': occupied / total if total > 0 else 0
             }
-
-            # Add current data if available
-            if current_data:
-                features.update(current_data)
-
-            # Predict
-            predicted_occupancy = self.predict(features)
-
-            predictions.append({
-                'target_time': target_time,
-                'predicted_occupancy_rate': predicted_occupancy,
-                'predicted_occupied_spaces': int(
-                    predicted_occupancy * config.PARKING_LOT_CONFIG['total_spaces']
-                ),
-                'predicted_available_spaces': int(
-                    (1 - predicted_occupancy) * config.PARKING_LOT_CONFIG['total_spaces']
-                )
-            })
-
-        return predictions
+        )
 
     def save_model(self):
-        """Save trained model and scaler"""
-        if self.model is None or self.scaler is None:
+        """Save trained model (and scaler, for models trained on scaled features)"""
+        if self.model is None:
             raise ValueError("No model to save")
 
         model_path = config.MODEL_CONFIG['model_path']
         scaler_path = config.MODEL_CONFIG['scaler_path']
 
         joblib.dump(self.model, model_path)
-        joblib.dump(self.scaler, scaler_path)
-
         print(f"Model saved to {model_path}")
-        print(f"Scaler saved to {scaler_path}")
+
+        # A scaler file on disk marks the model as trained on scaled features
+        if self.scaler is not None:
+            joblib.dump(self.scaler, scaler_path)
+            print(f"Scaler saved to {scaler_path}")
+        elif scaler_path.exists():
+            scaler_path.unlink()
 
     def load_model(self):
-        """Load trained model and scaler"""
+        """Load trained model (and scaler, if the model was trained with one)"""
         model_path = config.MODEL_CONFIG['model_path']
         scaler_path = config.MODEL_CONFIG['scaler_path']
 
-        if not model_path.exists() or not scaler_path.exists():
+        if not model_path.exists():
             raise FileNotFoundError("Model files not found. Train the model first.")
 
-        self.model = joblib.load(model_path)
-        self.scaler = joblib.load(scaler_path)
+        self.model = _load_joblib(str(model_path), model_path.stat().st_mtime)
+        self.scaler = None
+        if scaler_path.exists():
+            self.scaler = _load_joblib(str(scaler_path), scaler_path.stat().st_mtime)
 
-        print("Model and scaler loaded successfully")
+        print("Model loaded successfully")
 
     def get_historical_data(self, days: int = 30) -> pd.DataFrame:
-        """Get historical occupancy data from database"""
-        session = get_session()
+        """Get historical occupancy data from database (cached for HISTORY_CACHE_TTL seconds)"""
+        cached = _history_cache.get(days)
+        if cached and time.time() - cached[0] < HISTORY_CACHE_TTL:
+            return cached[1].copy()
 
         cutoff_date = datetime.now() - timedelta(days=days)
 
-        history = session.query(OccupancyHistory).filter(
+        # Plain column select read straight into a frame, no ORM objects
+        stmt = select(
+            OccupancyHistory.timestamp,
+            OccupancyHistory.occupied_spaces,
+            OccupancyHistory.available_spaces,
+            OccupancyHistory.occupancy_rate
+        ).where(
             OccupancyHistory.timestamp >= cutoff_date
-        ).all()
+        ).order_by(OccupancyHistory.timestamp)
 
-        session.close()
+        with engine.connect() as connection:
+            df = pd.read_sql(stmt, connection)
 
-        if not history:
-            return pd.DataFrame()
+        _history_cache[days] = (time.time(), df)
+        return df.copy()
 
-        data = [{
-            'timestamp': h.timestamp,
-            'occupied_spaces': h.occupied_spaces,
-            'available_spaces': h.available_spaces,
-            'occupancy_rate': h.occupancy_rate
-        } for h in history]
 
-        return pd.DataFrame(data)
+def format_predictions(predictions: List[Dict]) -> List[Dict]:
+    """Format predictions for the API response"""
+    return [{
+        'timestamp': p['target_time'],
+        'predicted_occupancy_rate': float(p['predicted_occupancy_rate']),
+        'predicted_occupied': p['predicted_occupied_spaces'],
+        'predicted_available': p['predicted_available_spaces']
+    } for p in predictions]
 
 
 if __name__ == "__main__":
@@ -3,6 +3,19 @@ import numpy as np
 from typing import List, Tuple, Dict
 from datetime import datetime
 import config
+from camera_stream import LatestFrameReader
+
+
+_KERNEL_3X3 = np.ones((3, 3), np.uint8)
+_KERNEL_5X5 = np.ones((5, 5), np.uint8)
+
+# Overlay colors by state: Green = available, Red = occupied, Yellow = motion detected
+_STATE_COLORS = np.array([(0, 255, 0), (0, 0, 255), (0, 255, 255)], np.uint8)
+
+
+def _odd_size(size: float) -> int:
+    """Nearest odd filter size of at least 3"""
+    return max(3, int(round(size)) // 2 * 2 + 1)
 
 
 class ParkingSpaceDetector:
@@ -11,13 +24,35 @@ class ParkingSpaceDetector:
     def __init__(self):
         self.parking_spaces = []
         self.previous_frame = None
+        self._previous_gray = None
+        self._geometry = None
+
+        # Space layout as parallel arrays (see define_parking_spaces)
+        self._corners = None
+        self._space_numbers = []
+        self._rows = []
+        self._cols = []
+        self._coordinates = []
+
+        # Per-frame working buffers, reused while the frame size stays the same
+        self._buffers = {}
+        self._mask_index = 0
+
+        # Cached overlay for draw_parking_spaces (see _draw_layout)
+        self._draw_cache = None
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Get a reusable uint8 buffer, reallocating only when the shape changes"""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[name] = np.empty(shape, np.uint8)
+        return buf
 
     def define_parking_spaces(self, image_shape: Tuple[int, int]) -> List[Dict]:
         """
         Define parking space regions based on image dimensions
         Returns list of parking space coordinates
         """
-        spaces = []
         rows = config.PARKING_LOT_CONFIG['rows']
         cols = config.PARKING_LOT_CONFIG['columns']
 
@@ -25,103 +60,94 @@ class ParkingSpaceDetector:
         space_width = width // cols
         space_height = height // rows
 
-        space_id = 1
-        for row in range(rows):
-            for col in range(cols):
-                x1 = col * space_width
-                y1 = row * space_height
-                x2 = x1 + space_width
-                y2 = y1 + space_height
-
-                spaces.append({
-                    'id': space_id,
-                    'space_number': f'P{space_id:03d}',
-                    'row': row,
-                    'column': col,
-                    'coordinates': (x1, y1, x2, y2)
-                })
-                space_id += 1
-
-        self.parking_spaces = spaces
-        return spaces
-
-    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
-        """Preprocess frame for better detection"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # Space layout as parallel arrays, built once and indexed every frame
+        space_rows, space_cols = np.divmod(np.arange(rows * cols), cols)
+        x1 = space_cols * space_width
+        y1 = space_rows * space_height
+        self._corners = np.stack([x1, y1, x1 + space_width, y1 + space_height])
+        self._geometry = None
+
+        self._space_numbers = [f'P{space_id:03d}' for space_id in range(1, rows * cols + 1)]
+        self._rows = space_rows.tolist()
+        self._cols = space_cols.tolist()
+        self._coordinates = list(zip(*self._corners.tolist()))
+
+        self.parking_spaces = [{
+            'id': space_id,
+            'space_number': space_number,
+            'row': row,
+            'column': col,
+            'coordinates': coordinates
+        } for space_id, space_number, row, col, coordinates in zip(
+            range(1, rows * cols + 1), self._space_numbers,
+            self._rows, self._cols, self._coordinates
+        )]
+
+        return self.parking_spaces
+
+    def _scaled_geometry(self, frame_shape: Tuple[int, int], processed_shape: Tuple[int, int]):
+        """Space corners and areas in the (downscaled) processed image, cached per shape"""
+        if self._geometry is None or self._geometry[0] != processed_shape:
+            scale_y = processed_shape[0] / frame_shape[0]
+            scale_x = processed_shape[1] / frame_shape[1]
+            scale = np.array([scale_x, scale_y, scale_x, scale_y])[:, None]
+
+            corners = np.round(self._corners * scale).astype(np.intp)
+            corners[[0, 2]] = np.clip(corners[[0, 2]], 0, processed_shape[1])
+            corners[[1, 3]] = np.clip(corners[[1, 3]], 0, processed_shape[0])
+
+            x1, y1, x2, y2 = corners
+            areas = np.maximum((x2 - x1) * (y2 - y1), 1)
+            self._geometry = (processed_shape, corners, areas)
+
+        return self._geometry[1], self._geometry[2]
+
+    def preprocess_frame(self, frame: np.ndarray, scale: float = 1.0,
+                         out: np.ndarray = None, gray_out: np.ndarray = None) -> np.ndarray:
+        """
+        Preprocess frame for better detection
 
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        Args:
+            frame: BGR image
+            scale: How much the frame was downscaled; filter sizes shrink with it
+            out: Optional uint8 buffer of the frame's height and width for the result
+            gray_out: Optional buffer of the same size to keep the grayscale frame in
+        """
+        block_size = _odd_size(25 * scale)
+        shape = frame.shape[:2]
+
+        # Convert to grayscale
+        if gray_out is None:
+            gray_out = self._buffer('gray', shape)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray_out)
 
-        # Apply adaptive thresholding
+        # Adaptive threshold against the local box mean (separable, much cheaper
+        # than the Gaussian-weighted variant, and smooths noise by itself)
         thresh = cv2.adaptiveThreshold(
-            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV, 25, 16
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+            cv2.THRESH_BINARY_INV, block_size, 16,
+            dst=self._buffer('thresh', shape)
         )
 
-        # Apply median blur to further reduce noise
-        median = cv2.medianBlur(thresh, 5)
-
-        # Dilate to fill gaps
-        kernel = np.ones((3, 3), np.uint8)
-        dilated = cv2.dilate(median, kernel, iterations=1)
+        # Erode away speckle, then dilate twice to fill gaps
+        # (same mask as a 3x3 opening followed by a 3x3 dilation)
+        eroded = cv2.erode(thresh, _KERNEL_3X3, dst=self._buffer('eroded', shape))
+        dilated = cv2.dilate(eroded, _KERNEL_5X5, dst=out)
 
         return dilated
 
-    def detect_occupancy_by_pixels(self, frame: np.ndarray, space: Dict) -> Tuple[bool, float]:
+    def _space_fractions(self, binary: np.ndarray, corners: np.ndarray, areas: np.ndarray) -> np.ndarray:
         """
-        Detect if parking space is occupied based on pixel intensity
-        Returns (is_occupied, confidence)
+        Fraction of white pixels inside every parking space of a 0/255 mask
+        Returns a flat array in parking_spaces order
         """
-        x1, y1, x2, y2 = space['coordinates']
-
-        # Extract region of interest
-        roi = frame[y1:y2, x1:x2]
-
-        if roi.size == 0:
-            return False, 0.0
-
-        # Calculate the number of white pixels (indicating presence of vehicle)
-        white_pixels = cv2.countNonZero(roi)
-        total_pixels = roi.shape[0] * roi.shape[1]
-
-        # Calculate occupancy percentage
-        occupancy_percentage = white_pixels / total_pixels
-
-        # Threshold for determining occupancy (adjust based on testing)
-        threshold = 0.25
-        is_occupied = occupancy_percentage > threshold
-
-        # Confidence based on how far from threshold
-        confidence = min(abs(occupancy_percentage - threshold) / threshold, 1.0)
-
-        return is_occupied, confidence
+        # Summed-area table: each space's sum is four lookups, whatever its size
+        ii = cv2.integral(binary, sdepth=cv2.CV_32S)
+        x1, y1, x2, y2 = corners
 
-    def detect_motion(self, current_frame: np.ndarray, space: Dict) -> bool:
-        """Detect motion in parking space using frame differencing"""
-        if self.previous_frame is None:
-            return False
+        white = (ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]) // 255
 
-        x1, y1, x2, y2 = space['coordinates']
-
-        # Extract ROI from both frames
-        curr_roi = current_frame[y1:y2, x1:x2]
-        prev_roi = self.previous_frame[y1:y2, x1:x2]
-
-        if curr_roi.size == 0 or prev_roi.size == 0:
-            return False
-
-        # Calculate absolute difference
-        diff = cv2.absdiff(curr_roi, prev_roi)
-
-        # Count pixels with significant change
-        motion_pixels = cv2.countNonZero(diff)
-        total_pixels = diff.shape[0] * diff.shape[1]
-
-        motion_percentage = motion_pixels / total_pixels
-
-        # Motion detected if more than 10% pixels changed
-        return motion_percentage > 0.1
+        return white / areas
 
     def detect_all_spaces(self, frame: np.ndarray) -> List[Dict]:
         """
@@ -131,61 +157,159 @@ class ParkingSpaceDetector:
         if not self.parking_spaces:
             self.define_parking_spaces(frame.shape)
 
-        # Preprocess frame
-        processed = self.preprocess_frame(frame)
+        # Occupancy is a coarse per-space decision, so preprocess a downscaled frame
+        scale = config.IMAGE_CONFIG['detection_scale']
+        small = frame
+        if scale != 1:
+            height, width = frame.shape[:2]
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            small = cv2.resize(
+                frame, size, dst=self._buffer('small', (size[1], size[0]) + frame.shape[2:]),
+                interpolation=cv2.INTER_AREA
+            )
 
-        results = []
-        for space in self.parking_spaces:
-            is_occupied, confidence = self.detect_occupancy_by_pixels(processed, space)
-            has_motion = self.detect_motion(processed, space)
+        # Double-buffered masks: this frame's mask is written over the one from
+        # two frames ago, while previous_frame keeps pointing at the last one
+        # (the grayscale frames alternate the same way for motion detection)
+        self._mask_index ^= 1
+        mask = self._buffer(f'mask{self._mask_index}', small.shape[:2])
+        gray = self._buffer(f'gray{self._mask_index}', small.shape[:2])
+        processed = self.preprocess_frame(small, scale, out=mask, gray_out=gray)
+        corners, areas = self._scaled_geometry(frame.shape[:2], processed.shape[:2])
+
+        # A space is occupied when more than 25% of it is foreground;
+        # confidence grows with the distance from that threshold
+        threshold = 0.25
+        occupancy = self._space_fractions(processed, corners, areas)
+        occupied = occupancy > threshold
+        confidence = np.minimum(np.abs(occupancy - threshold) / threshold, 1.0)
+
+        # Motion compares grayscale frames, so threshold flicker in the masks
+        # doesn't count as movement; a pixel moved if it changed by more than 25,
+        # and a space has motion when more than 10% of its pixels moved
+        if self._previous_gray is None or self._previous_gray.shape != gray.shape:
+            motion = np.zeros(len(occupancy), dtype=bool)
+        else:
+            diff = cv2.absdiff(gray, self._previous_gray, dst=self._buffer('diff', gray.shape))
+            cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY, dst=diff)
+            motion = self._space_fractions(diff, corners, areas) > 0.1
+
+        results = [{
+            'space_number': space_number,
+            'row': row,
+            'column': col,
+            'is_occupied': is_occupied,
+            'confidence': space_confidence,
+            'has_motion': has_motion,
+            'coordinates': coordinates
+        } for space_number, row, col, is_occupied, space_confidence, has_motion, coordinates in zip(
+            self._space_numbers, self._rows, self._cols,
+            occupied.tolist(), confidence.tolist(), motion.tolist(), self._coordinates
+        )]
+
+        # Update previous frame (no copy, the next frame writes the other buffers)
+        self.previous_frame = processed
+        self._previous_gray = gray
 
-            results.append({
-                'space_number': space['space_number'],
-                'row': space['row'],
-                'column': space['column'],
-                'is_occupied': is_occupied,
-                'confidence': confidence,
-                'has_motion': has_motion,
-                'coordinates': space['coordinates']
-            })
+        return results
 
-        # Update previous frame
-        self.previous_frame = processed.copy()
+    def _draw_layout(self, shape: Tuple[int, ...], coordinates: List[Tuple]) -> Dict:
+        """Cached overlay of space outlines and labels, reset when the layout changes"""
+        layout = self._draw_cache
+        if layout is None or layout['shape'] != shape or layout['coordinates'] != coordinates:
+            height, width = shape[:2]
+
+            # Area each space draws into (the outline spills one pixel out)
+            regions = [(max(x1 - 1, 0), max(y1 - 1, 0), min(x2 + 2, width), min(y2 + 2, height))
+                       for x1, y1, x2, y2 in coordinates]
+
+            # Spaces drawing into each other's area, in drawing order
+            overlaps = [[j for j, (l2, t2, r2, b2) in enumerate(regions)
+                         if l2 < r1 and l1 < r2 and t2 < b1 and t1 < b2]
+                        for l1, t1, r1, b1 in regions]
+
+            layout = self._draw_cache = {
+                'shape': shape,
+                'coordinates': coordinates,
+                'regions': regions,
+                'overlaps': overlaps,
+                'overlay': np.zeros(shape, np.uint8),
+                'ink': np.zeros(shape[:2], np.uint8),
+                'labels': [None] * len(coordinates)
+            }
+
+        return layout
+
+    @staticmethod
+    def _draw_space(canvas: np.ndarray, origin: Tuple[int, int], coordinates: Tuple,
+                    space_number: str, label: Tuple[int, str]):
+        """Draw one space's outline and labels onto a canvas whose top-left is `origin`"""
+        left, top = origin
+        x1, y1, x2, y2 = coordinates
+        x1, y1, x2, y2 = x1 - left, y1 - top, x2 - left, y2 - top
+        state, confidence = label
+        color = tuple(_STATE_COLORS[state].tolist())
+
+        # Draw rectangle
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 2)
+
+        # Draw space number
+        cv2.putText(
+            canvas, space_number,
+            (x1 + 5, y1 + 25),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2
+        )
 
-        return results
+        # Draw confidence
+        cv2.putText(
+            canvas, confidence,
+            (x1 + 5, y2 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1
+        )
 
     def draw_parking_spaces(self, frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
         """Draw parking spaces on frame with color coding"""
         output = frame.copy()
 
-        for detection in detections:
-            x1, y1, x2, y2 = detection['coordinates']
+        coordinates = [detection['coordinates'] for detection in detections]
+        layout = self._draw_layout(frame.shape, coordinates)
+        overlay, ink, labels = layout['overlay'], layout['ink'], layout['labels']
 
+        # Find the spaces whose color or confidence text changed since the
+        # last frame; everything else is already on the overlay
+        changed = []
+        for i, detection in enumerate(detections):
             # Color coding: Green = available, Red = occupied, Yellow = motion detected
-            if detection['has_motion']:
-                color = (0, 255, 255)  # Yellow
-            elif detection['is_occupied']:
-                color = (0, 0, 255)  # Red
-            else:
-                color = (0, 255, 0)  # Green
-
-            # Draw rectangle
-            cv2.rectangle(output, (x1, y1), (x2, y2), color, 2)
-
-            # Draw space number
-            cv2.putText(
-                output, detection['space_number'],
-                (x1 + 5, y1 + 25),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2
-            )
-
-            # Draw confidence
-            conf_text = f"{detection['confidence']:.2f}"
-            cv2.putText(
-                output, conf_text,
-                (x1 + 5, y2 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1
-            )
+            state = 2 if detection['has_motion'] else int(detection['is_occupied'])
+            label = (state, f"{detection['confidence']:.2f}")
+            if labels[i] != label:
+                labels[i] = label
+                changed.append(i)
+
+        if len(changed) == len(detections):
+            # First frame or everything changed: draw the whole overlay in order
+            overlay[:] = 0
+            for i, detection in enumerate(detections):
+                self._draw_space(overlay, (0, 0), coordinates[i], detection['space_number'], labels[i])
+            cv2.cvtColor(overlay, cv2.COLOR_BGR2GRAY, dst=ink)
+            changed = []
+
+        # Repaint the area of each changed space, redrawing every space that
+        # reaches into it in space order (clipped to the area), so shared
+        # borders come out as a full redraw would draw them
+        for i in changed:
+            left, top, right, bottom = layout['regions'][i]
+            canvas = overlay[top:bottom, left:right]
+            canvas[:] = 0
+
+            for j in layout['overlaps'][i]:
+                self._draw_space(canvas, (left, top), coordinates[j],
+                                 detections[j]['space_number'], labels[j])
+
+            cv2.cvtColor(canvas, cv2.COLOR_BGR2GRAY, dst=ink[top:bottom, left:right])
+
+        # Stamp all outlines and labels onto the frame in one masked copy
+        cv2.copyTo(overlay, ink, output)
 
         # Draw summary
         total = len(detections)
@@ -205,20 +329,26 @@ class ParkingSpaceDetector:
 def test_detector_with_webcam():
     """Test the detector using webcam"""
     detector = ParkingSpaceDetector()
-    cap = cv2.VideoCapture(0)
+    # Frames are captured and resized on a background thread
+    cap = LatestFrameReader(0, size=(1280, 720))
 
     print("Press 'q' to quit")
 
+    # Occupancy doesn't change between consecutive frames, so detect every
+    # Nth frame and keep drawing the last result in between
+    detect_every = config.PARKING_LOT_CONFIG['preview_detect_every']
+    frame_index = 0
+    detections = []
+
     while True:
         ret, frame = cap.read()
         if not ret:
             break
 
-        # Resize frame for better performance
-        frame = cv2.resize(frame, (1280, 720))
-
         # Detect parking spaces
-        detections = detector.detect_all_spaces(frame)
+        if frame_index % detect_every == 0:
+            detections = detector.detect_all_spaces(frame)
+        frame_index += 1
 
         # Draw results
         output = detector.draw_parking_spaces(frame, detections)
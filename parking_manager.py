@@ -4,8 +4,12 @@ Parking Manager - Utilities for managing parking lot operations
 import cv2
 import numpy as np
 from datetime import datetime
+from typing import List, Dict
+from sqlalchemy import select, insert, update
+from sqlalchemy.orm.exc import StaleDataError
 from database import get_session, ParkingSpace, OccupancyHistory, ParkingEvent
 from parking_detector import ParkingSpaceDetector
+from camera_stream import LatestFrameReader
 import config
 
 
@@ -15,6 +19,18 @@ class ParkingManager:
     def __init__(self):
         self.detector = ParkingSpaceDetector()
         self.session = get_session()
+        self._load_space_cache()
+
+    def _load_space_cache(self):
+        """Cache space ids and statuses so camera updates don't query per space"""
+        rows = self.session.execute(
+            select(ParkingSpace.id, ParkingSpace.space_number, ParkingSpace.is_occupied)
+        ).all()
+
+        self._spaces_by_number = {
+            row.space_number: {'id': row.id, 'is_occupied': row.is_occupied}
+            for row in rows
+        }
 
     def initialize_parking_spaces(self):
         """Initialize parking spaces in database"""
@@ -26,6 +42,7 @@ class ParkingManager:
         # Create new spaces
         rows = config.PARKING_LOT_CONFIG['rows']
         cols = config.PARKING_LOT_CONFIG['columns']
+        now = datetime.utcnow()
 
         space_id = 1
         for row in range(rows):
@@ -35,53 +52,80 @@ class ParkingManager:
                     row=row,
                     column=col,
                     is_occupied=False,
-                    last_updated=datetime.now()
+                    last_updated=now
                 )
                 self.session.add(space)
                 space_id += 1
 
         self.session.commit()
+        self._load_space_cache()
         print(f"Initialized {rows * cols} parking spaces")
 
     def update_from_camera(self, frame: np.ndarray):
         """Update parking status from camera frame"""
         detections = self.detector.detect_all_spaces(frame)
+        # One clock read per frame, in UTC like the column defaults
+        now = datetime.utcnow()
 
-        for detection in detections:
-            space = self.session.query(ParkingSpace).filter_by(
-                space_number=detection['space_number']
-            ).first()
-
-            if space:
-                old_status = space.is_occupied
-                new_status = detection['is_occupied']
-
-                # Update space
-                space.is_occupied = new_status
-                space.last_updated = datetime.now()
-
-                # Log event if status changed
-                if old_status != new_status:
-                    event = ParkingEvent(
-                        space_number=detection['space_number'],
-                        event_type='entry' if new_status else 'exit',
-                        confidence=detection['confidence']
-                    )
-                    self.session.add(event)
+        try:
+            self._apply_detections(detections, now)
+        except StaleDataError:
+            # The spaces were re-created with new ids (e.g. /api/initialize);
+            # the cache was reloaded on rollback, so retry once
+            self._apply_detections(detections, now)
 
-        self.session.commit()
+        return detections
 
-        # Update occupancy history
-        self.record_occupancy_snapshot()
+    def _apply_detections(self, detections: List[Dict], now: datetime):
+        """Write detected statuses, status-change events and a snapshot in one commit"""
+        updates = []
+        events = []
+        for detection in detections:
+            space = self._spaces_by_number.get(detection['space_number'])
+            if space is None:
+                continue
 
-        return detections
+            new_status = detection['is_occupied']
+            updates.append({'id': space['id'], 'is_occupied': new_status, 'last_updated': now})
 
-    def record_occupancy_snapshot(self):
-        """Record current occupancy state to history"""
-        spaces = self.session.query(ParkingSpace).all()
+            # Log event if status changed
+            if space['is_occupied'] != new_status:
+                events.append({
+                    'space_number': detection['space_number'],
+                    'event_type': 'entry' if new_status else 'exit',
+                    'confidence': detection['confidence']
+                })
+
+            space['is_occupied'] = new_status
+
+        occupied = sum(1 for space in self._spaces_by_number.values() if space['is_occupied'])
+
+        # One executemany per table instead of a SELECT and UPDATE per space,
+        # committed together with the occupancy snapshot
+        try:
+            if updates:
+                self.session.execute(update(ParkingSpace), updates)
+            if events:
+                self.session.execute(insert(ParkingEvent), events)
+            self.record_occupancy_snapshot(len(self._spaces_by_number), occupied)
+        except Exception:
+            self.session.rollback()
+            self._load_space_cache()
+            raise
+
+    def record_occupancy_snapshot(self, total: int = None, occupied: int = None):
+        """
+        Record current occupancy state to history
+
+        Args:
+            total: Total spaces, if the caller already knows the counts
+            occupied: Occupied spaces; both are read from the database if omitted
+        """
+        if total is None or occupied is None:
+            spaces = self.session.query(ParkingSpace).all()
+            total = len(spaces)
+            occupied = sum(1 for s in spaces if s.is_occupied)
 
-        total = len(spaces)
-        occupied = sum(1 for s in spaces if s.is_occupied)
         available = total - occupied
         occupancy_rate = (occupied / total) if total > 0 else 0
 
@@ -100,7 +144,9 @@ class ParkingManager:
         spaces = self.session.query(ParkingSpace).all()
 
         total = len(spaces)
-        occupied = sum(1 for s in spaces if s.is_occupied)
+        occupied = int(np.fromiter(
+            (bool(s.is_occupied) for s in spaces), dtype=np.uint8, count=total
+        ).sum())
         available = total - occupied
 
         return {
@@ -118,26 +164,37 @@ class ParkingManager:
 
     def simulate_random_occupancy(self, occupancy_percentage: float = 0.6):
         """Simulate random parking occupancy for testing"""
-        spaces = self.session.query(ParkingSpace).all()
-
-        for space in spaces:
-            old_status = space.is_occupied
-            new_status = np.random.random() < occupancy_percentage
-
-            space.is_occupied = new_status
-            space.last_updated = datetime.now()
-
-            # Log event if status changed
-            if old_status != new_status:
-                event = ParkingEvent(
-                    space_number=space.space_number,
-                    event_type='entry' if new_status else 'exit',
-                    confidence=1.0
-                )
-                self.session.add(event)
-
-        self.session.commit()
-        self.record_occupancy_snapshot()
+        self._load_space_cache()
+        numbers = list(self._spaces_by_number)
+        spaces = [self._spaces_by_number[number] for number in numbers]
+        now = datetime.utcnow()
+
+        old = np.fromiter((s['is_occupied'] for s in spaces), dtype=bool, count=len(spaces))
+        new = np.random.random(len(spaces)) < occupancy_percentage
+        changed = np.flatnonzero(old != new)
+
+        updates = [{'id': space['id'], 'is_occupied': status, 'last_updated': now}
+                   for space, status in zip(spaces, new.tolist())]
+        # Log events only for spaces whose status changed
+        events = [{
+            'space_number': numbers[i],
+            'event_type': 'entry' if new[i] else 'exit',
+            'confidence': 1.0
+        } for i in changed.tolist()]
+
+        try:
+            if updates:
+                self.session.execute(update(ParkingSpace), updates)
+            if events:
+                self.session.execute(insert(ParkingEvent), events)
+            self.record_occupancy_snapshot(len(spaces), int(new.sum()))
+        except Exception:
+            self.session.rollback()
+            self._load_space_cache()
+            raise
+
+        for space, status in zip(spaces, new.tolist()):
+            space['is_occupied'] = status
 
         print(f"Simulated occupancy at {occupancy_percentage * 100}%")
 
@@ -149,7 +206,8 @@ class ParkingManager:
 def run_camera_monitoring():
     """Run continuous camera monitoring"""
     manager = ParkingManager()
-    cap = cv2.VideoCapture(0)
+    # Capture runs on its own thread so detection never waits on the camera
+    cap = LatestFrameReader(0, size=(1280, 720))
 
     print("Starting camera monitoring...")
     print("Press 'q' to quit")
@@ -157,6 +215,7 @@ def run_camera_monitoring():
 
     frame_count = 0
     update_interval = config.PARKING_LOT_CONFIG['detection_interval'] * config.PARKING_LOT_CONFIG['camera_fps']
+    detections = []
 
     try:
         while True:
@@ -165,23 +224,18 @@ def run_camera_monitoring():
                 print("Failed to capture frame")
                 break
 
-            # Resize frame
-            frame = cv2.resize(frame, (1280, 720))
-
             # Update database periodically
             if frame_count % update_interval == 0:
                 print(f"Updating parking status... (frame {frame_count})")
                 detections = manager.update_from_camera(frame)
 
-                # Draw detections
-                annotated_frame = manager.detector.draw_parking_spaces(frame, detections)
-
                 # Display status
                 status = manager.get_current_status()
                 print(f"Available: {status['available']}/{status['total']} "
                       f"({status['occupancy_rate']:.1f}% occupied)")
-            else:
-                annotated_frame = frame
+
+            # Draw the latest detections on every frame
+            annotated_frame = manager.detector.draw_parking_spaces(frame, detections)
 
             # Display frame
             cv2.imshow('Smart Parking - Camera Monitor', annotated_frame)
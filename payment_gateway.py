@@ -0,0 +1,66 @@
+"""
+Payment Gateway - Stripe client for real (non-demo) payments
+"""
+import requests
+import config
+
+STRIPE_API_BASE = 'https://api.stripe.com/v1'
+
+# One pooled session per process so checkouts reuse TCP/TLS connections to Stripe
+_session = None
+
+
+class PaymentGatewayError(Exception):
+    """Raised when the payment gateway rejects or fails a request"""
+
+
+def get_session() -> requests.Session:
+    """Get the shared, connection-pooled HTTP session"""
+    global _session
+
+    if _session is None:
+        _session = requests.Session()
+        _session.auth = (config.PAYMENT_CONFIG['stripe_secret_key'], '')
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config.PAYMENT_CONFIG['gateway_pool_size']
+        )
+        _session.mount('https://', adapter)
+
+    return _session
+
+
+def create_payment_intent(amount: float, currency: str, reference: str,
+                          email: str = None) -> dict:
+    """
+    Create a Stripe PaymentIntent for a booking payment
+
+    Args:
+        amount: Amount in major currency units (e.g. dollars)
+        currency: ISO currency code
+        reference: Our payment reference, used as the idempotency key
+        email: Optional receipt email
+
+    Returns:
+        Stripe PaymentIntent object
+    """
+    data = {
+        'amount': int(round(amount * 100)),
+        'currency': currency.lower(),
+        'metadata[payment_reference]': reference
+    }
+    if email:
+        data['receipt_email'] = email
+
+    try:
+        response = get_session().post(
+            f'{STRIPE_API_BASE}/payment_intents',
+            data=data,
+            headers={'Idempotency-Key': reference},
+            timeout=config.PAYMENT_CONFIG['gateway_timeout']
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise PaymentGatewayError(str(e)) from e
+
+    return response.json()
@@ -0,0 +1,56 @@
+"""
+Prediction Worker - Refreshes cached occupancy predictions in the background
+
+Run alongside the web app so /api/occupancy/predict is served from Redis:
+    python predict_worker.py
+"""
+import time
+import orjson
+import config
+from cache import get_client, set_bytes, PREDICTIONS_KEY
+from ml_predictor import OccupancyPredictor, format_predictions
+
+
+def refresh_predictions(predictor: OccupancyPredictor):
+    """Compute predictions for the configured horizon and cache them"""
+    predictions = predictor.predict_from_database(
+        hours_ahead=config.MODEL_CONFIG['prediction_horizon']
+    )
+
+    body = orjson.dumps({
+        'success': True,
+        'predictions': format_predictions(predictions)
+    })
+
+    set_bytes(PREDICTIONS_KEY, body, config.MODEL_CONFIG['prediction_cache_ttl'])
+
+
+def run_worker():
+    """Refresh predictions every `prediction_refresh_interval` seconds"""
+    if get_client() is None:
+        print("Redis caching is not available. Install redis and set REDIS_URL.")
+        return
+
+    predictor = OccupancyPredictor()
+    predictor.load_model()
+
+    interval = config.MODEL_CONFIG['prediction_refresh_interval']
+    print(f"Refreshing predictions every {interval}s")
+    print("Press Ctrl+C to stop")
+
+    try:
+        while True:
+            try:
+                refresh_predictions(predictor)
+                print(f"[{time.strftime('%H:%M:%S')}] Predictions refreshed")
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] Prediction refresh failed: {e}")
+
+            time.sleep(interval)
+
+    except KeyboardInterrupt:
+        print("Prediction worker stopped")
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -800,7 +800,7 @@ function displayYoloResults(data) {
 
     // Display annotated image
     const annotatedImage = document.getElementById('yoloAnnotatedImage');
-    annotatedImage.src = data.annotated_image;
+    annotatedImage.src = data.annotated_image_url;
 
     // Update parking grid with YOLO detections
     updateParkingGridFromDetections(data.detections);
@@ -7,13 +7,16 @@ from pathlib import Path
 
 BASE_URL = "http://localhost:5000"
 
+# One pooled connection reused across the tests
+SESSION = requests.Session()
+
 def test_yolo_status():
     """Test 1: Check YOLO status"""
     print("=" * 50)
     print("TEST 1: Checking YOLO Status")
     print("=" * 50)
 
-    response = requests.get(f"{BASE_URL}/api/detection/yolo/status")
+    response = SESSION.get(f"{BASE_URL}/api/detection/yolo/status")
     data = response.json()
 
     print(f"Status: {response.status_code}")
@@ -49,7 +52,7 @@ def test_yolo_detection():
 
         with open(test_image, 'rb') as f:
             files = {'image': f}
-            response = requests.post(
+            response = SESSION.post(
                 f"{BASE_URL}/api/detection/yolo/upload",
                 files=files
             )
@@ -66,12 +69,11 @@ def test_yolo_detection():
                 status = "OCCUPIED" if det['is_occupied'] else "EMPTY"
                 print(f"  {det['space_number']}: {status} (confidence: {det['confidence']:.2f})")
 
-            # Save annotated image
-            if 'annotated_image' in data:
-                import base64
-                img_data = data['annotated_image'].split(',')[1]
+            # Save annotated image (served as raw JPEG bytes)
+            if 'annotated_image_url' in data:
+                image_response = SESSION.get(f"{BASE_URL}{data['annotated_image_url']}")
                 with open('detection_result.jpg', 'wb') as f:
-                    f.write(base64.b64decode(img_data))
+                    f.write(image_response.content)
                 print(f"\n✓ Annotated image saved as: detection_result.jpg")
         else:
             print(f"✗ Detection failed: {response.status_code}")
@@ -0,0 +1,98 @@
+"""
+Booking/payment references must stay unique across forked worker processes
+"""
+import base64
+import importlib.util
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the app off the real database and model files
+_tmp = Path(tempfile.mkdtemp())
+os.environ['DATABASE_URL'] = f'sqlite:///{_tmp / "test.db"}'
+
+import config  # noqa: E402
+
+config.MODEL_CONFIG['model_path'] = _tmp / 'model.pkl'
+config.MODEL_CONFIG['scaler_path'] = _tmp / 'scaler.pkl'
+
+import app  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location(
+    'gunicorn_conf', Path(__file__).resolve().parent.parent / 'gunicorn.conf.py'
+)
+gunicorn_conf = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gunicorn_conf)
+
+
+def _worker_references(results, count, server=None, worker=None):
+    if worker is not None:
+        gunicorn_conf.post_fork(server, worker)
+    results.put([app.generate_reference('BK') for _ in range(count)])
+
+
+def _worker_byte(reference):
+    value = int.from_bytes(base64.b32decode(reference[2:] + '==='), 'big')
+    return value >> 8 & 0xFF
+
+
+class GenerateReferenceTest(unittest.TestCase):
+
+    def _fork_workers(self, count, hooks):
+        """Fork two workers that each generate `count` references in the same millisecond"""
+        frozen_ns = time.time_ns()
+        original = time.time_ns
+        time.time_ns = lambda: frozen_ns
+
+        try:
+            context = multiprocessing.get_context('fork')
+            results = context.Queue()
+            server = types.SimpleNamespace(WORKERS={})
+            workers = []
+            for _ in range(2):
+                args = (results, count)
+                if hooks:
+                    worker = types.SimpleNamespace()
+                    gunicorn_conf.pre_fork(server, worker)
+                    args += (server, worker)
+                process = context.Process(target=_worker_references, args=args)
+                process.start()
+                if hooks:
+                    server.WORKERS[process.pid] = worker
+                workers.append(process)
+            first, second = results.get(timeout=30), results.get(timeout=30)
+            for process in workers:
+                process.join()
+        finally:
+            time.time_ns = original
+
+        return first, second
+
+    def test_unique_across_forked_workers(self):
+        """Two workers forked from a preloaded app booking in the same millisecond"""
+        first, second = self._fork_workers(200, hooks=False)
+
+        self.assertEqual(len(set(first)), len(first))
+        self.assertFalse(set(first) & set(second))
+
+    def test_unique_across_gunicorn_slots(self):
+        """Under gunicorn the worker slot, not the pid (which can repeat modulo 256), tags references"""
+        first, second = self._fork_workers(200, hooks=True)
+
+        self.assertEqual(len(set(first)), len(first))
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual({_worker_byte(first[0]), _worker_byte(second[0])}, {0, 1})
+
+    def test_prefix(self):
+        self.assertTrue(app.generate_reference('PAY').startswith('PAY'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Status endpoints must count spaces whose is_occupied was stored as NULL
+"""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the app off the real database, model files and Redis
+_tmp = Path(tempfile.mkdtemp())
+os.environ['DATABASE_URL'] = f'sqlite:///{_tmp / "test.db"}'
+os.environ['CACHE_ENABLED'] = '0'
+
+import config  # noqa: E402
+
+config.MODEL_CONFIG['model_path'] = _tmp / 'model.pkl'
+config.MODEL_CONFIG['scaler_path'] = _tmp / 'scaler.pkl'
+
+import app  # noqa: E402
+from database import ParkingSpace, OccupancyHistory  # noqa: E402
+from parking_manager import ParkingManager  # noqa: E402
+
+
+class NullOccupancyTest(unittest.TestCase):
+
+    def setUp(self):
+        app.init_db()
+        self.manager = ParkingManager()
+        self.manager.initialize_parking_spaces()
+
+        self.client = app.app.test_client()
+        self.client.post('/api/parking/update', json={'space_number': 'P001', 'is_occupied': True})
+        # No is_occupied in the body stores NULL
+        self.client.post('/api/parking/update', json={'space_number': 'P002'})
+
+    def tearDown(self):
+        self.manager.close()
+
+    def test_status_endpoint(self):
+        response = self.client.get('/api/parking/status')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['statistics']['occupied'], 1)
+
+    def test_manager_status(self):
+        self.manager.session.expire_all()
+        status = self.manager.get_current_status()
+
+        self.assertEqual(status['total'], config.PARKING_LOT_CONFIG['total_spaces'])
+        self.assertEqual(status['occupied'], 1)
+
+    def test_camera_update_with_unmapped_null_space(self):
+        """A NULL space outside the camera grid keeps its status in the cache"""
+        self.manager.session.add(ParkingSpace(space_number='P999', row=99, column=99))
+        self.manager.session.commit()
+        self.client.post('/api/parking/update', json={'space_number': 'P999'})
+        self.manager._load_space_cache()
+
+        self.manager.update_from_camera(np.zeros((720, 1280, 3), np.uint8))
+
+        snapshot = self.manager.session.query(OccupancyHistory).order_by(OccupancyHistory.id.desc()).first()
+        self.assertEqual(snapshot.total_spaces, config.PARKING_LOT_CONFIG['total_spaces'] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,15 +3,18 @@ YOLO-based Parking Space Detector
 Integrates trained YOLO model with the smart parking system
 """
 
+import threading
 import cv2
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 from pathlib import Path
+from datetime import datetime
 import config
 
 # Try to import YOLO - will work once ultralytics is installed and model is trained
 try:
     from ultralytics import YOLO
+    import torch
     YOLO_AVAILABLE = True
 except ImportError:
     YOLO_AVAILABLE = False
@@ -31,6 +34,13 @@ class YOLOParkingDetector:
         """
         self.model = None
         self.model_loaded = False
+        self.device = 'cpu'
+        self.half = False
+        self._class_names = {}
+        self._occ_lut = None
+        self._model_path = None
+        self._placed = False
+        self._place_lock = threading.Lock()
 
         if not YOLO_AVAILABLE:
             print("YOLO not available. Please install: pip install ultralytics")
@@ -54,7 +64,7 @@ class YOLOParkingDetector:
         if model_path and Path(model_path).exists():
             try:
                 print(f"Loading YOLO model from: {model_path}")
-                self.model = YOLO(str(model_path))
+                self._load_model(Path(model_path))
                 self.model_loaded = True
                 print(f"✓ YOLO model loaded successfully")
             except Exception as e:
@@ -64,6 +74,61 @@ class YOLOParkingDetector:
             print(f"No YOLO model found. Tried: {model_path}")
             print("Please add your trained model as 'best.pt' in the project root")
 
+    def _load_model(self, model_path: Path):
+        """
+        Load the weights on the CPU
+
+        Choosing the device (and moving the model to CUDA or building a
+        TensorRT engine) waits for the first inference, so a gunicorn master
+        that preloads the app never initializes CUDA: a CUDA context does not
+        survive fork into the workers.
+        """
+        self._model_path = model_path
+        self.model = YOLO(str(model_path))
+
+        # Class names, built once per model instead of per result
+        self._class_names = self.model.names
+
+    @staticmethod
+    def _resolve_device(device: str) -> str:
+        """Configured device, CUDA when available if unset; bare ids like '0' mean 'cuda:0'"""
+        if not device:
+            return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        # Inference runs on one device, so '0,1' uses the first
+        first = device.split(',')[0].strip()
+        return f'cuda:{first}' if first.isdigit() else device
+
+    def _ensure_device(self):
+        """Place the model on its device at FP16 (or as a TensorRT engine) on CUDA, once per process"""
+        if self._placed:
+            return
+
+        with self._place_lock:
+            if self._placed:
+                return
+
+            yolo_config = config.YOLO_CONFIG
+            self.device = self._resolve_device(yolo_config['device'])
+            self.half = yolo_config['half'] and self.device.startswith('cuda')
+            model_path = self._model_path
+
+            if yolo_config['tensorrt'] and self.device.startswith('cuda') and model_path.suffix == '.pt':
+                # Build the engine once, rebuilding it only when the weights are newer
+                engine_path = model_path.with_suffix('.engine')
+                if not engine_path.exists() or engine_path.stat().st_mtime < model_path.stat().st_mtime:
+                    print(f"Exporting TensorRT engine to: {engine_path}")
+                    engine_path = Path(self.model.export(format='engine', half=self.half, device=self.device))
+                self.model = YOLO(str(engine_path), task=self.model.task)
+            else:
+                self.model.to(self.device)
+
+            # Occupied lookup on the inference device
+            self._occupancy_lut(torch.device(self.device))
+
+            print(f"YOLO inference device: {self.device}{' (FP16)' if self.half else ''}")
+            self._placed = True
+
     def detect_from_image(self, image_path: str, conf_threshold: float = 0.5) -> List[Dict]:
         """
         Detect parking spaces from an image file
@@ -78,8 +143,10 @@ class YOLOParkingDetector:
         if not self.model_loaded:
             return []
 
+        self._ensure_device()
+
         # Run inference
-        results = self.model(image_path, conf=conf_threshold)
+        results = self.model(image_path, conf=conf_threshold, device=self.device, half=self.half)
 
         return self._parse_results(results[0])
 
@@ -97,11 +164,59 @@ class YOLOParkingDetector:
         if not self.model_loaded:
             return []
 
+        self._ensure_device()
+
         # Run inference
-        results = self.model(frame, conf=conf_threshold)
+        results = self.model(frame, conf=conf_threshold, device=self.device, half=self.half)
 
         return self._parse_results(results[0])
 
+    def detect_from_frames(self, frames: List[np.ndarray], conf_threshold: float = 0.5) -> List[List[Dict]]:
+        """
+        Detect parking spaces in several images with one batched model call
+
+        Args:
+            frames: List of OpenCV images (numpy arrays)
+            conf_threshold: Confidence threshold for detections
+
+        Returns:
+            One list of detection dictionaries per frame, in input order
+        """
+        if not self.model_loaded or not frames:
+            return [[] for _ in frames]
+
+        self._ensure_device()
+
+        # stream=True yields results one at a time instead of holding the whole batch
+        results = self.model(frames, conf=conf_threshold, stream=True, verbose=False,
+                             device=self.device, half=self.half)
+
+        return [self._parse_results(result) for result in results]
+
+    def detect_from_stream(self, source, conf_threshold: float = 0.5) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+        """
+        Detect parking spaces continuously from a camera or video stream
+
+        Ultralytics reads the source on its own thread and keeps one predictor
+        set up for the whole stream, instead of redoing per-call setup per frame.
+
+        Args:
+            source: Camera index, video file or stream URL (e.g. 'rtsp://...')
+            conf_threshold: Confidence threshold for detections
+
+        Yields:
+            (frame, detections) for each frame read from the source
+        """
+        if not self.model_loaded:
+            return
+
+        self._ensure_device()
+        results = self.model.predict(source=source, conf=conf_threshold, stream=True, verbose=False,
+                                     device=self.device, half=self.half)
+
+        for result in results:
+            yield result.orig_img, self._parse_results(result)
+
     def _parse_results(self, result) -> List[Dict]:
         """
         Parse YOLO results into standardized format for the frontend
@@ -113,69 +228,72 @@ class YOLOParkingDetector:
         Returns:
             List of dictionaries matching the database ParkingSpace schema
         """
-        detections = []
-
-        # Get boxes, confidences, and classes
-        boxes = result.boxes.xyxy.cpu().numpy()  # x1, y1, x2, y2
-        confidences = result.boxes.conf.cpu().numpy()
-        classes = result.boxes.cls.cpu().numpy()
-
-        # Get class names
-        class_names = result.names
-
-        # Process each detection
-        for idx, (box, conf, cls) in enumerate(zip(boxes, confidences, classes)):
-            x1, y1, x2, y2 = map(int, box)
-            class_id = int(cls)
-            class_name = class_names[class_id]
-
-            # Determine if space is occupied based on class
-            # Common class names: 'space-empty', 'space-occupied', 'empty', 'occupied', etc.
-            is_occupied = 'occupied' in class_name.lower() or class_id == 1
-
-            # Calculate row and column based on position (simplified)
-            # You may need to adjust this based on your parking lot layout
-            image_height, image_width = result.orig_shape
-            center_x = (x1 + x2) // 2
-            center_y = (y1 + y2) // 2
-
-            # Estimate row and column from position
-            rows = config.PARKING_LOT_CONFIG['rows']
-            cols = config.PARKING_LOT_CONFIG['columns']
-
-            row = int((center_y / image_height) * rows)
-            col = int((center_x / image_width) * cols)
-
-            # Generate space number
-            space_number = f'P{idx + 1:03d}'
-
-            detection = {
-                'space_number': space_number,
-                'row': row,
-                'column': col,
-                'is_occupied': is_occupied,
-                'confidence': float(conf),
-                'class_name': class_name,
-                'coordinates': (x1, y1, x2, y2),
-                'center': (center_x, center_y)
-            }
-
-            detections.append(detection)
-
-        return detections
-
-    def draw_detections(self, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        boxes = result.boxes
+
+        # Determine if space is occupied based on class, on the device
+        # Common class names: 'space-empty', 'space-occupied', 'empty', 'occupied', etc.
+        class_ids = boxes.cls.long()
+        occupied = self._occupancy_lut(class_ids.device)[class_ids]
+
+        # One device-to-host copy: x1, y1, x2, y2, confidence, class, occupied
+        data = torch.cat([boxes.data[:, :6], occupied[:, None].to(boxes.data.dtype)], dim=1).cpu().numpy()
+
+        coordinates = data[:, :4].astype(int)
+        centers = (coordinates[:, :2] + coordinates[:, 2:]) // 2
+
+        # Calculate row and column based on position (simplified)
+        # You may need to adjust this based on your parking lot layout
+        image_height, image_width = result.orig_shape
+        rows = config.PARKING_LOT_CONFIG['rows']
+        cols = config.PARKING_LOT_CONFIG['columns']
+        space_rows = (centers[:, 1] / image_height * rows).astype(int)
+        space_cols = (centers[:, 0] / image_width * cols).astype(int)
+
+        class_names = self._class_names
+
+        return [{
+            'space_number': f'P{idx + 1:03d}',
+            'row': row,
+            'column': col,
+            'is_occupied': bool(is_occupied),
+            'confidence': conf,
+            'class_name': class_names[int(class_id)],
+            'coordinates': tuple(box),
+            'center': tuple(center)
+        } for idx, (box, center, row, col, conf, class_id, is_occupied) in enumerate(zip(
+            coordinates.tolist(), centers.tolist(), space_rows.tolist(), space_cols.tolist(),
+            data[:, 4].tolist(), data[:, 5].tolist(), data[:, 6].tolist()
+        ))]
+
+    def _occupancy_lut(self, device) -> 'torch.Tensor':
+        """Class id -> occupied lookup table on the given device (moved only if the device changes)"""
+        if self._occ_lut is None or self._occ_lut.device != device:
+            self._occ_lut = torch.tensor([
+                'occupied' in self._class_names[class_id].lower() or class_id == 1
+                for class_id in range(len(self._class_names))
+            ], dtype=torch.bool, device=device)
+
+        return self._occ_lut
+
+    def draw_detections(self, image: np.ndarray, detections: List[Dict],
+                        out: np.ndarray = None) -> np.ndarray:
         """
         Draw detection boxes on image
 
         Args:
             image: OpenCV image
             detections: List of detection dictionaries
+            out: Optional preallocated buffer of the same shape to draw into,
+                 so repeated calls don't allocate a new image each time
 
         Returns:
             Image with drawn detections
         """
-        output = image.copy()
+        if out is not None and out.shape == image.shape and out.dtype == image.dtype:
+            np.copyto(out, image)
+            output = out
+        else:
+            output = image.copy()
 
         for det in detections:
             x1, y1, x2, y2 = det['coordinates']
@@ -227,6 +345,7 @@ class YOLOParkingDetector:
             if space:
                 # Update existing space
                 space.is_occupied = det['is_occupied']
+                space.coordinates = det['coordinates']
                 space.last_updated = datetime.utcnow()
             else:
                 # Create new space (if needed)
@@ -235,6 +354,7 @@ class YOLOParkingDetector:
                     row=det['row'],
                     column=det['column'],
                     is_occupied=det['is_occupied'],
+                    coordinates=det['coordinates'],
                     hourly_rate=5.0  # Default rate
                 )
                 db_session.add(space)
@@ -254,18 +374,10 @@ def test_yolo_detector():
         print("4. Run: pip install ultralytics")
         return
 
-    # Test with webcam
-    cap = cv2.VideoCapture(0)
+    # Test with webcam; the stream keeps one predictor and reads frames on its own thread
     print("Press 'q' to quit, 's' to save screenshot")
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Detect parking spaces
-        detections = detector.detect_from_frame(frame)
-
+    for frame, detections in detector.detect_from_stream(0):
         # Draw results
         output = detector.draw_detections(frame, detections)
 
@@ -280,7 +392,6 @@ def test_yolo_detector():
             cv2.imwrite(filename, output)
             print(f"Saved: {filename}")
 
-    cap.release()
     cv2.destroyAllWindows()
 
 